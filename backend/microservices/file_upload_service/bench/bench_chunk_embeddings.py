@@ -0,0 +1,115 @@
+"""
+Embedding calls and retrieval quality of the chunk vectors produced by each
+`INGEST_CHUNK_EMBEDDING` mode: "reembed" and "pooled".
+
+Queries are random halves of sentences from the corpus, and a query is answered
+correctly when the chunk holding its sentence ranks first (recall@1) or in the
+top five (recall@5). Runs offline on the generated corpus and bag-of-words
+embeddings by default; set BENCH_EMBEDDINGS=configured to use the provider
+configured through EMBEDDING_PROVIDER and EMBEDDING_MODEL instead.
+
+    python -m bench.bench_chunk_embeddings [sentences] [queries]
+"""
+import os
+import re
+import sys
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from bench.bench_text_splitter import HashedEmbeddings, make_document
+from src.utils.embedding_cache import ContentHashEmbeddings
+from src.utils.embeddings import DOCUMENT_PREFIX, QUERY_PREFIX, load_dense_embeddings
+from src.utils.text_splitter import SemanticChunker
+
+SENTENCES = 2000
+QUERIES = 500
+MODES = ("reembed", "pooled")
+
+
+class CountingEmbeddings(Embeddings):
+    """Counts the texts sent to the wrapped provider."""
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def chunk_vectors(mode, provider, text):
+    """Chunk the text and embed the chunks the way `VectorDB` does in the given mode."""
+    counting = CountingEmbeddings(provider)
+    dense = counting if mode == "reembed" else ContentHashEmbeddings(counting)
+    chunker = SemanticChunker(embeddings=dense, breakpoint_threshold_type="percentile")
+    if mode == "pooled":
+        pairs = chunker.split_text_with_embeddings(text)
+        chunks = [chunk for chunk, _ in pairs]
+        for chunk, vector in pairs:
+            if vector is not None:
+                dense.seed(f"{DOCUMENT_PREFIX}{chunk}", vector)
+    else:
+        chunks = chunker.split_text(text)
+    vectors = dense.embed_documents([f"{DOCUMENT_PREFIX}{chunk}" for chunk in chunks])
+    return chunks, np.asarray(vectors), counting.texts
+
+
+def make_queries(text, chunks, count, seed=0):
+    """Random halves of random sentences, with the index of the chunk each comes from."""
+    rng = np.random.default_rng(seed)
+    sentences = re.split(r"(?<=[.?!])\s+", text)
+    owner = np.repeat(np.arange(len(chunks)), [len(re.split(r"(?<=[.?!])\s+", c)) for c in chunks])
+    assert len(owner) == len(sentences)
+    queries, answers = [], []
+    for index in rng.choice(len(sentences), size=min(count, len(sentences)), replace=False):
+        words = sentences[index].split()
+        kept = sorted(rng.choice(len(words), size=max(1, len(words) // 2), replace=False))
+        queries.append(f"{QUERY_PREFIX}{' '.join(words[i] for i in kept)}")
+        answers.append(owner[index])
+    return queries, np.asarray(answers)
+
+
+def rank_of_answers(query_vectors, chunk_vectors, answers):
+    def unit(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    scores = unit(query_vectors) @ unit(chunk_vectors).T
+    answer_scores = scores[np.arange(len(answers)), answers]
+    return (scores > answer_scores[:, None]).sum(axis=1)
+
+
+def main(sentences, queries):
+    if os.getenv("BENCH_EMBEDDINGS") == "configured":
+        provider, label = load_dense_embeddings(), "configured provider"
+    else:
+        provider, label = HashedEmbeddings(), "bag-of-words embeddings"
+    text = make_document(sentences)
+    print(f"{sentences} sentences, {queries} queries, {label}")
+
+    reference = None
+    query_vectors = None
+    for mode in MODES:
+        chunks, vectors, calls = chunk_vectors(mode, provider, text)
+        if reference is None:
+            reference = chunks
+            questions, answers = make_queries(text, chunks, queries)
+            query_vectors = np.asarray([provider.embed_query(question) for question in questions])
+        elif chunks != reference:
+            raise SystemExit(f"{mode} produced different chunks")
+        ranks = rank_of_answers(query_vectors, vectors, answers)
+        print(
+            f"{mode:>8}: {len(chunks):4d} chunks  {calls:5d} texts embedded  "
+            f"recall@1 {np.mean(ranks == 0):.3f}  recall@5 {np.mean(ranks < 5):.3f}  "
+            f"MRR {np.mean(1 / (ranks + 1)):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else SENTENCES,
+        int(sys.argv[2]) if len(sys.argv) > 2 else QUERIES,
+    )
@@ -0,0 +1,80 @@
+"""
+Pages per second of the pdfium and pdfplumber text extraction backends, and the
+backend `INGEST_PDF_BACKEND=auto` picks, on the given PDFs or a generated corpus.
+
+    python -m bench.bench_pdf_backends [file.pdf ...]
+"""
+import os
+import sys
+import time
+import tempfile
+from src.utils import loaders
+
+PAGES = int(os.getenv("BENCH_PAGES", "200"))
+LINES_PER_PAGE = 45
+WORDS = "retrieval augmented generation grounds answers in the uploaded documents".split()
+
+
+def write_pdf(path: str, pages: int, table: bool = False) -> None:
+    """Write a plain text PDF; with `table`, every page also gets a ruled grid."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(pages):
+        lines = [b"BT /F1 10 Tf 12 TL 50 760 Td"]
+        for line in range(LINES_PER_PAGE):
+            words = " ".join(WORDS[(number + line + i) % len(WORDS)] for i in range(12))
+            lines.append(f"({words} {number}.{line}) '".encode())
+        lines.append(b"ET")
+        if table:
+            for row in range(16):
+                lines.append(f"50 {200 + row * 15} m 550 {200 + row * 15} l S".encode())
+            for column in range(6):
+                lines.append(f"{50 + column * 100} 200 m {50 + column * 100} 425 l S".encode())
+        stream = b"\n".join(lines)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (index, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def measure(path: str) -> None:
+    pages = loaders.count_pdf_pages(path)
+    choice = loaders.choose_pdf_backend(path, pages)
+    print(f"{os.path.basename(path)}: {pages} pages, auto picks {choice}")
+    for name, load in loaders.PDF_BACKENDS.items():
+        started = time.perf_counter()
+        documents = load(path, 0, pages)
+        elapsed = time.perf_counter() - started
+        chars = sum(len(doc.page_content) for doc in documents)
+        print(f"{name:>12}: {pages / elapsed:8.1f} pages/s  {elapsed:6.2f} s  {chars} chars")
+
+
+def main(paths) -> None:
+    if paths:
+        for path in paths:
+            measure(path)
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        for name, table in (("text.pdf", False), ("tables.pdf", True)):
+            path = os.path.join(folder, name)
+            write_pdf(path, PAGES, table=table)
+            measure(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,173 @@
+"""
+SemanticChunker on a long document: the NumPy implementation against the
+previous per-sentence dict and pairwise `cosine_similarity` loop, checking that
+both produce the same chunks for every breakpoint threshold type.
+
+    python -m bench.bench_text_splitter [sentences]
+"""
+import re
+import sys
+import time
+import numpy as np
+from langchain_community.utils.math import cosine_similarity
+from langchain_core.embeddings import Embeddings
+from src.utils.text_splitter import BREAKPOINT_DEFAULTS, SemanticChunker
+
+SENTENCES = 10_000
+DIMENSIONS = 256
+ROUNDS = 5
+TOPICS = 40
+WORDS_PER_TOPIC = 30
+
+
+def make_document(sentences: int, seed: int = 0) -> str:
+    """Sentences drawn from one topic vocabulary at a time, switching topic every 10 to 60 sentences."""
+    rng = np.random.default_rng(seed)
+    lines = []
+    while len(lines) < sentences:
+        topic = rng.integers(TOPICS)
+        for _ in range(rng.integers(10, 60)):
+            words = rng.integers(WORDS_PER_TOPIC, size=rng.integers(6, 16))
+            lines.append(" ".join(f"t{topic}w{w}" for w in words).capitalize() + ".")
+    return " ".join(lines[:sentences])
+
+
+class HashedEmbeddings(Embeddings):
+    """Bag of words over fixed random word vectors, memoized so timings exclude embedding."""
+    def __init__(self, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.words = {}
+        self.memo = {}
+
+    def _vector(self, text):
+        total = np.zeros(DIMENSIONS)
+        for word in re.findall(r"\w+", text.lower()):
+            if word not in self.words:
+                self.words[word] = self.rng.standard_normal(DIMENSIONS)
+            total += self.words[word]
+        return total.tolist()
+
+    def embed_documents(self, texts):
+        for text in texts:
+            if text not in self.memo:
+                self.memo[text] = self._vector(text)
+        return [self.memo[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# Previous implementation, as it was before the NumPy rewrite
+def legacy_combine_sentences(sentences, buffer_size=1):
+    for i in range(len(sentences)):
+        combined_sentence = ""
+        for j in range(i - buffer_size, i):
+            if j >= 0:
+                combined_sentence += sentences[j]["sentence"] + " "
+        combined_sentence += sentences[i]["sentence"]
+        for j in range(i + 1, i + 1 + buffer_size):
+            if j < len(sentences):
+                combined_sentence += " " + sentences[j]["sentence"]
+        sentences[i]["combined_sentence"] = combined_sentence
+    return sentences
+
+
+def legacy_calculate_cosine_distances(sentences):
+    distances = []
+    for i in range(len(sentences) - 1):
+        embedding_current = sentences[i]["combined_sentence_embedding"]
+        embedding_next = sentences[i + 1]["combined_sentence_embedding"]
+        similarity = cosine_similarity([embedding_current], [embedding_next])[0][0]
+        distance = 1 - similarity
+        distances.append(distance)
+        sentences[i]["distance_to_next"] = distance
+    return distances, sentences
+
+
+class LegacySemanticChunker(SemanticChunker):
+    def _calculate_sentence_distances(self, single_sentences_list):
+        _sentences = [
+            {"sentence": x, "index": i} for i, x in enumerate(single_sentences_list)
+        ]
+        sentences = legacy_combine_sentences(_sentences, self.buffer_size)
+        embeddings = self.embeddings.embed_documents(
+            [x["combined_sentence"] for x in sentences]
+        )
+        for i, sentence in enumerate(sentences):
+            sentence["combined_sentence_embedding"] = embeddings[i]
+        return legacy_calculate_cosine_distances(sentences)
+
+    def split_text(self, text):
+        single_sentences_list = re.split(self.sentence_split_regex, text)
+        if len(single_sentences_list) == 1:
+            return single_sentences_list
+        if (
+            self.breakpoint_threshold_type == "gradient"
+            and len(single_sentences_list) == 2
+        ):
+            return single_sentences_list
+        distances, sentences = self._calculate_sentence_distances(single_sentences_list)
+        if self.number_of_chunks is not None:
+            breakpoint_distance_threshold = self._threshold_from_clusters(distances)
+            breakpoint_array = distances
+        else:
+            (
+                breakpoint_distance_threshold,
+                breakpoint_array,
+            ) = self._calculate_breakpoint_threshold(distances)
+        indices_above_thresh = [
+            i for i, x in enumerate(breakpoint_array) if x > breakpoint_distance_threshold
+        ]
+        chunks = []
+        start_index = 0
+        for index in indices_above_thresh:
+            end_index = index
+            group = sentences[start_index : end_index + 1]
+            combined_text = " ".join([d["sentence"] for d in group])
+            if (
+                self.min_chunk_size is not None
+                and len(combined_text) < self.min_chunk_size
+            ):
+                continue
+            chunks.append(combined_text)
+            start_index = index + 1
+        if start_index < len(sentences):
+            chunks.append(" ".join([d["sentence"] for d in sentences[start_index:]]))
+        return chunks
+
+
+def best_time(split, text):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        chunks = split(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings), chunks
+
+
+def main(sentences: int) -> None:
+    text = make_document(sentences)
+    embeddings = HashedEmbeddings()
+    settings = [{"breakpoint_threshold_type": kind} for kind in BREAKPOINT_DEFAULTS]
+    settings += [{"number_of_chunks": 200}, {"min_chunk_size": 1500}]
+    print(f"{sentences} sentences, {len(text)} chars, {DIMENSIONS}-dimensional embeddings, best of {ROUNDS}")
+    for options in settings:
+        legacy = LegacySemanticChunker(embeddings, **options)
+        current = SemanticChunker(embeddings, **options)
+        # Warm the embedding memo so only the chunker itself is timed
+        current.split_text(text)
+        legacy_seconds, legacy_chunks = best_time(legacy.split_text, text)
+        current_seconds, current_chunks = best_time(current.split_text, text)
+        identical = legacy_chunks == current_chunks
+        label = ", ".join(f"{key}={value}" for key, value in options.items())
+        print(
+            f"{label:>43}: {len(current_chunks):5d} chunks  identical={identical}  "
+            f"loop {legacy_seconds * 1000:7.1f} ms  numpy {current_seconds * 1000:6.1f} ms  "
+            f"{legacy_seconds / current_seconds:5.1f}x"
+        )
+        if not identical:
+            raise SystemExit(f"Chunk boundaries differ for {label}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SENTENCES)
@@ -1,10 +1,13 @@
 import os
+import asyncio
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Request, HTTPException, status
+from typing import List, Optional
 from pydantic import BaseModel
-from .service import VectorDB
-from .utils.utils import clean_folder
+from .service import SUPPORTED_EXTENSIONS, VectorDB
+from .jobs import job_manager
+from .utils.utils import UploadTooLargeError, load_manifest, read_generation, remove_unlisted_files
+from .utils.uploads import MultipartUploadWriter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,64 +16,166 @@ class UploadResponse(BaseModel):
     message: str
     files: List[str]
     count: int
+    job_id: str
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: str
+    files: List[str]
+    pages_parsed: int
+    chunks_embedded: int
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
 
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
 QDRANT_FOLDER = os.path.join(os.getcwd(), "qdrant")
+MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_MB", "100")) * 1024 * 1024
+MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "500")) * 1024 * 1024
 
 router = APIRouter(
     prefix="/v1",
     tags=["Database"]
 )
 
-@router.post('/file-upload', response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
-async def vectordb(files: List[UploadFile] = File(...)):
+# The body is parsed by hand, so describe it for the generated docs
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    },
+                    "required": ["files"],
+                }
+            }
+        },
+    }
+}
+
+@router.post(
+    '/file-upload',
+    response_model=UploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=UPLOAD_REQUEST_BODY,
+)
+async def vectordb(request: Request):
     """    
-    This endpoint accepts multiple files, saves them to the upload directory,
-    cleans existing data, and creates a vector database collection from the uploaded files.
+    This endpoint accepts multiple files, which replace the uploaded corpus, and
+    queues a job that incrementally updates the vector database collection to match.
+    Files that were already indexed under the same name with identical contents are
+    not re-embedded, and the points of files left out of the upload are deleted.
+    Progress is available from `/v1/jobs/{job_id}`.
+
+    The multipart body is parsed incrementally as it is received: file parts are
+    written to disk in the order they arrive, off the event loop, and hashed while
+    they are written, so memory stays flat regardless of upload size. Per-file and
+    per-request size limits are enforced while the body streams in, including for
+    chunked requests without a Content-Length. Partially written files are removed
+    if the upload fails for any reason.
     
     Args:
-        files (List[UploadFile]): List of files to upload and process.
+        request (Request): Incoming multipart/form-data request with a `files` field.
     
     Returns:
-        UploadResponse: Response containing upload status, list of processed files,
-                        and count of successfully uploaded files.
+        UploadResponse: Response containing upload status, list of uploaded files,
+                        count of successfully uploaded files and the ingestion job id.
     """
     logger.info("Executing file upload microservice")
-    if not files:
-        raise HTTPException(status_code=400, detail="No files uploaded")
-
-    # Clean uploads and qdrant folders
     for folder in [UPLOAD_FOLDER, QDRANT_FOLDER]:
-        if os.path.exists(folder):
-            clean_folder(folder)
-        else:
-            os.makedirs(folder, exist_ok=True)
+        os.makedirs(folder, exist_ok=True)
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail="Upload exceeds the request size limit")
+
+    try:
+        writer = MultipartUploadWriter(
+            request.headers.get("content-type"), UPLOAD_FOLDER, MAX_FILE_BYTES, MAX_REQUEST_BYTES
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await asyncio.to_thread(writer.feed, chunk)
+        received = await asyncio.to_thread(writer.finish)
+    except UploadTooLargeError as e:
+        await asyncio.to_thread(writer.discard)
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        await asyncio.to_thread(writer.discard)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        # Client disconnects, cancellation and disk errors must not leave partial files behind
+        writer.discard()
+        raise
+
+    if not received:
+        raise HTTPException(status_code=400, detail="No files uploaded")
 
+    generation = read_generation(QDRANT_FOLDER)
+    manifest = load_manifest(os.path.join(QDRANT_FOLDER, generation)) if generation else {}
+    seen_hashes = set()
     uploaded_files = []
+    corpus = []
+    # Only move files into place once the whole batch is within limits
+    for filename, tmp_path, _, digest in received:
+        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        if digest in seen_hashes:
+            # Identical content earlier in this batch
+            os.unlink(tmp_path)
+        elif manifest.get(filename) == digest and os.path.isfile(file_path):
+            # Already indexed under this name with identical contents
+            os.unlink(tmp_path)
+            corpus.append(filename)
+        else:
+            os.replace(tmp_path, file_path)
+            corpus.append(filename)
+        seen_hashes.add(digest)
+        uploaded_files.append(filename)
 
-    for file in files:
-        if not file.filename:
-            continue
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-        uploaded_files.append(file.filename)
-
-    if uploaded_files:
-        logger.info("Starting vector database creation...")
-        try:
-            vectordb_service = VectorDB()
-            vectordb_service.create_vectordb(UPLOAD_FOLDER)
-            logger.info("Vector database creation completed successfully")
-        except Exception as e:
-            logger.error(f"Error creating vector database: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to create vector database: {str(e)}")
-    else:
+    if not uploaded_files:
         raise HTTPException(status_code=400, detail="No valid files uploaded")
 
-    logger.info(f"File upload completed. {len(uploaded_files)} files processed")
+    # The upload is the new corpus: the job drops the points of files left out
+    removed = remove_unlisted_files(UPLOAD_FOLDER, corpus, SUPPORTED_EXTENSIONS)
+    if removed:
+        logger.info(f"Removed {len(removed)} files that are not part of the new upload")
+
+    job = job_manager.submit(
+        uploaded_files, lambda job: VectorDB().create_vectordb(UPLOAD_FOLDER, job)
+    )
+    if job is None:
+        raise HTTPException(status_code=429, detail="Too many ingestion jobs in progress")
+
+    logger.info(f"File upload completed. {len(uploaded_files)} files queued as job {job.id}")
     return UploadResponse(
         message="Files uploaded successfully",
         files=uploaded_files,
-        count=len(uploaded_files)
-    )
\ No newline at end of file
+        count=len(uploaded_files),
+        job_id=job.id
+    )
+
+
+@router.get('/jobs/{job_id}', response_model=JobResponse)
+async def job_status(job_id: str):
+    """
+    Report the progress of an ingestion job.
+
+    Args:
+        job_id (str): Id returned by the file upload endpoint.
+
+    Returns:
+        JobResponse: Status, current stage, pages parsed, chunks embedded and
+                     the error message if the job failed.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job.to_dict())
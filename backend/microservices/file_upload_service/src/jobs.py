@@ -0,0 +1,142 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of ingestion jobs processed at once
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+# Jobs waiting or running beyond this limit are rejected
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "16"))
+# Finished jobs kept around for status queries
+INGEST_JOB_HISTORY = 100
+
+
+class IngestJob:
+    """
+    Progress of a single ingestion job, updated by the worker running it.
+    """
+    def __init__(self, files: List[str]) -> None:
+        self.id = uuid.uuid4().hex
+        self.files = files
+        self.status = "queued"
+        self.stage = "queued"
+        self.pages_parsed = 0
+        self.chunks_embedded = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+
+    def update(self, **fields) -> None:
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+
+    def add(self, **counters) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "files": self.files,
+                "pages_parsed": self.pages_parsed,
+                "chunks_embedded": self.chunks_embedded,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """
+    Runs ingestion jobs in a bounded background worker pool and keeps their status.
+    """
+    def __init__(self, workers: int = INGEST_WORKERS, max_pending: int = INGEST_MAX_PENDING) -> None:
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+
+    def submit(self, files: List[str], task: Callable[[IngestJob], None]) -> Optional[IngestJob]:
+        """
+        Queue a job that calls `task` with its `IngestJob` for progress reporting.
+
+        Args:
+            files (List[str]): Names of the files the job ingests
+            task (Callable): Work to run in the background
+
+        Returns:
+            Optional[IngestJob]: The queued job, or None if the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+            job = IngestJob(files)
+            self._jobs[job.id] = job
+            self._prune()
+        future = self._executor.submit(self._run, job, task)
+        future.add_done_callback(lambda future: self._on_done(job, future))
+        return job
+
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+    def shutdown(self) -> None:
+        """Stop accepting work. Jobs that have not started yet are marked cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def _run(self, job: IngestJob, task: Callable[[IngestJob], None]) -> None:
+        job.update(status="running")
+        try:
+            task(job)
+            job.update(status="completed", stage="done")
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}")
+            job.update(status="failed", error=str(e))
+        finally:
+            job.update(finished_at=time.time())
+            with self._lock:
+                self._pending -= 1
+
+
+    def _on_done(self, job: IngestJob, future: Future) -> None:
+        # `_run` reports jobs that started; a cancelled future never ran
+        if future.cancelled():
+            job.update(
+                status="cancelled",
+                stage="cancelled",
+                error="Service shut down before the job started",
+                finished_at=time.time(),
+            )
+            with self._lock:
+                self._pending -= 1
+
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - INGEST_JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
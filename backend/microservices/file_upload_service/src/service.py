@@ -1,17 +1,99 @@
 import os
+import shutil
 import logging
-from typing import List
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from .utils.text_splitter import SemanticChunker
-from langchain_community.document_loaders import PDFPlumberLoader
-from langchain_community.document_loaders import UnstructuredHTMLLoader
+from .utils.loaders import run_task, split_tasks
+from .utils.embedding_cache import ContentHashEmbeddings
+from .utils.embedding_executor import EmbeddingExecutor
+from .utils.embeddings import (
+    DOCUMENT_PREFIX,
+    embedding_identity,
+    load_dense_embeddings,
+    read_embedding_identity,
+    save_embedding_identity,
+)
+from .utils.utils import (
+    file_sha256,
+    load_manifest,
+    new_generation,
+    prune_generations,
+    publish_generation,
+    read_generation,
+    retire_generation,
+    save_manifest,
+)
 from langchain_core.documents import Document
 from langchain_qdrant import FastEmbedSparse
-from langchain_nomic import NomicEmbeddings
+from qdrant_client import QdrantClient, models
+from .jobs import IngestJob
 
 logger = logging.getLogger(__name__)
 
-os.environ["NOMIC_API_KEY"] = os.getenv("NOMIC_API_KEY")
+QDRANT_PATH = "./qdrant"
+COLLECTION_NAME = "qdrantdb"
+SUPPORTED_EXTENSIONS = (".pdf", ".html")
+# Worker processes used to parse documents and the PDF pages handled per task
+PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+# How chunk vectors are obtained: "reembed" embeds every chunk after chunking,
+# "pooled" uses the mean of the chunker's sentence window vectors instead
+CHUNK_EMBEDDING_MODE = os.getenv("INGEST_CHUNK_EMBEDDING", "reembed")
+CHUNK_EMBEDDING_MODES = ("reembed", "pooled")
+# Chunks handed to the vector store per embed + upsert round
+UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "512"))
+# Seconds a superseded generation is kept so readers can finish with it and switch over
+GENERATION_GRACE_SECONDS = float(os.getenv("INGEST_GENERATION_GRACE_SECONDS", "600"))
+
+# Fail at startup rather than halfway through an ingest
+if CHUNK_EMBEDDING_MODE not in CHUNK_EMBEDDING_MODES:
+    raise ValueError(
+        f"Unknown INGEST_CHUNK_EMBEDDING {CHUNK_EMBEDDING_MODE!r}; "
+        f"expected one of {', '.join(CHUNK_EMBEDDING_MODES)}"
+    )
+
+# Generations are derived from the published one, so updates must not interleave
+_ingest_lock = threading.Lock()
+# Batched, concurrent and retrying calls to the embedding provider, shared by all jobs
+embedding_executor = EmbeddingExecutor(load_dense_embeddings())
+
+
+def stale_points_filter(folder_path: str, stale_files: Dict[str, str]) -> models.Filter:
+    """
+    Select the points of files that changed or were removed since the last update.
+
+    Files with identical contents share a `content_hash`, so points are matched on
+    the file they were loaded from as well as the hash it had when indexed.
+
+    Args:
+        folder_path (str): Folder the files were loaded from
+        stale_files (Dict[str, str]): Filename to the content hash it was indexed with
+
+    Returns:
+        models.Filter: Filter matching every point of the stale files
+    """
+    return models.Filter(
+        should=[
+            models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="metadata.source",
+                        match=models.MatchValue(value=os.path.join(folder_path, name)),
+                    ),
+                    models.FieldCondition(
+                        key="metadata.content_hash",
+                        match=models.MatchValue(value=content_hash),
+                    ),
+                ]
+            )
+            for name, content_hash in stale_files.items()
+        ]
+    )
 
 
 class VectorDB:
@@ -19,14 +101,22 @@ class VectorDB:
     A class for creating and managing vector databases from document collections.
     """
     def __init__(self) -> None:
-        self.dense_embeddings = NomicEmbeddings(model="nomic-embed-text-v1.5")
+        self.embedding_executor = embedding_executor
+        self.dense_embeddings = self.embedding_executor
         self.sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+        if CHUNK_EMBEDDING_MODE == "pooled":
+            # Pooled chunk vectors are seeded here and served to the vector store
+            self.dense_embeddings = ContentHashEmbeddings(self.dense_embeddings)
 
 
     def chunking(self, documents: List[Document]) -> List[dict]:
         """
         Uses semantic chunking with percentile-based breakpoint threshold
         to create document chunks that preserve context.
+
+        In "pooled" mode the vector of every chunk is derived from the sentence
+        window embeddings computed while chunking and seeded into the embedding
+        cache, so the vector store does not embed the chunk again.
         
         Args:
             documents (List[Document]): List of documents to be chunked
@@ -38,7 +128,13 @@ class VectorDB:
             embeddings=self.dense_embeddings,
             breakpoint_threshold_type="percentile"
         )
-        chunks = chunker.split_documents(documents)
+        if CHUNK_EMBEDDING_MODE != "pooled":
+            return chunker.split_documents(documents)
+
+        chunks, vectors = chunker.split_documents_with_embeddings(documents)
+        for chunk, vector in zip(chunks, vectors):
+            if vector is not None:
+                self.dense_embeddings.seed(f"{DOCUMENT_PREFIX}{chunk.page_content}", vector)
         return chunks
 
 
@@ -54,53 +150,257 @@ class VectorDB:
             List[Document]: Modified documents with search prefix added
         """
         for doc in documents:
-            doc.page_content = f"search_document: {doc.page_content}"
+            doc.page_content = f"{DOCUMENT_PREFIX}{doc.page_content}"
         return documents
 
 
-    def create_vectordb(self, folder_path: str):
+    def load_files(self, file_paths: List[str]) -> Iterator[Tuple[str, List[Document]]]:
         """
-        Create a Qdrant vector database with hybrid retrieval capabilities 
-        using both dense and sparse embeddings.
-        
+        Load PDF and HTML files in parallel across a process pool.
+
+        Large PDFs are split into page ranges so a single file can use several
+        workers. Results are yielded as soon as each task completes, in no
+        particular order, so callers can process them without waiting for the
+        whole batch. At most two tasks per worker are in flight, so parsed pages
+        never pile up faster than the caller consumes them.
+
+        Args:
+            file_paths (List[str]): Paths of the files to load
+
+        Yields:
+            Tuple[str, List[Document]]: Filename and the documents of one completed task
+        """
+        tasks = [task for file_path in file_paths for task in split_tasks(file_path, PAGES_PER_TASK)]
+        workers = min(PARSE_WORKERS, len(tasks))
+        if workers <= 1:
+            for task in tasks:
+                yield run_task(task)
+            return
+
+        # Spawned workers only import the loaders, not this service
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            remaining = iter(tasks)
+            pending = {pool.submit(run_task, task) for task in itertools.islice(remaining, workers * 2)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    task = next(remaining, None)
+                    if task is not None:
+                        pending.add(pool.submit(run_task, task))
+
+
+    def iter_chunks(
+        self, file_paths: List[str], hashes: Dict[str, str], job: IngestJob
+    ) -> Iterator[Document]:
+        """
+        Stream the chunks of the given files, page batch by page batch.
+
+        Args:
+            file_paths (List[str]): Paths of the files to ingest
+            hashes (Dict[str, str]): Content hash of every file, by filename
+            job (IngestJob): Job to report parsed pages to
+
+        Yields:
+            Document: Chunks tagged with the `content_hash` of their file
+        """
+        for filename, documents in self.load_files(file_paths):
+            job.add(pages_parsed=len(documents))
+            for doc in documents:
+                doc.metadata["content_hash"] = hashes[filename]
+            yield from self.chunking(documents)
+
+
+    def validate_generation(
+        self, storage_path: str, files: Dict[str, str], new_hashes: List[str], chunk_count: int
+    ) -> None:
+        """
+        Check a freshly written generation before it is published.
+
+        The collection must exist when any file is indexed, hold at least the chunks
+        added by this update and answer a dense query with one of its own vectors.
+
+        Args:
+            storage_path (str): Path to the generation's storage directory
+            files (Dict[str, str]): Filename to content hash of every indexed file
+            new_hashes (List[str]): Content hashes of the files added by this update
+            chunk_count (int): Number of chunks added by this update
+
+        Raises:
+            RuntimeError: If the generation is missing data or cannot be queried
+        """
+        client = QdrantClient(path=storage_path)
+        try:
+            if not client.collection_exists(COLLECTION_NAME):
+                if files and chunk_count:
+                    raise RuntimeError(f"Collection '{COLLECTION_NAME}' was not created")
+                return
+
+            added = client.count(
+                collection_name=COLLECTION_NAME,
+                count_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="metadata.content_hash",
+                            match=models.MatchAny(any=new_hashes),
+                        )
+                    ]
+                ),
+                exact=True,
+            ).count if new_hashes else 0
+            if added < chunk_count:
+                raise RuntimeError(f"Expected {chunk_count} new points, found {added}")
+
+            points, _ = client.scroll(collection_name=COLLECTION_NAME, limit=1, with_vectors=True)
+            if points:
+                vector = points[0].vector
+                dense = vector[""] if isinstance(vector, dict) else vector
+                hits = client.query_points(
+                    collection_name=COLLECTION_NAME, query=dense, using="", limit=1
+                ).points
+                if not hits:
+                    raise RuntimeError("Dense query returned no results")
+        finally:
+            client.close()
+
+
+    def create_vectordb(self, folder_path: str, job: Optional[IngestJob] = None):
+        """
+        Incrementally update the Qdrant vector database with hybrid retrieval
+        capabilities using both dense and sparse embeddings.
+
+        Every supported file in the folder is identified by the SHA-256 of its
+        contents. Files already indexed with the same hash are skipped, points of
+        changed or removed files are deleted by their `source` and `content_hash`
+        payload fields, and only new chunks are embedded. Pages flow through load -> chunk ->
+        prefix -> embed -> upsert in batches of `INGEST_UPSERT_BATCH_SIZE` chunks,
+        so memory held by the pipeline does not grow with the size of the upload.
+        Changes are applied to a copy of the
+        published generation, which is then published atomically so readers are
+        never pointed at a half-written collection. Concurrent calls are serialized.
+
         Args:
             folder_path (str): Path to the folder containing documents to process
+            job (IngestJob, optional): Job to report stage and progress to
         """
+        job = job or IngestJob([])
+        with _ingest_lock:
+            self._update_vectordb(folder_path, job)
+
+
+    def _update_vectordb(self, folder_path: str, job: IngestJob):
+        # The executor is shared by every job; report only this job's share
+        embedding_stats = self.embedding_executor.stats()
         try:
-            if not os.path.exists("./qdrant"):
-                os.makedirs("qdrant")
+            job.update(stage="hashing")
+            if not os.path.exists(QDRANT_PATH):
+                os.makedirs(QDRANT_PATH)
 
-            all_documents = []
             if not os.path.isdir(folder_path):
                 raise ValueError("Not a valid directory")
 
+            files = {}
             for filename in os.listdir(folder_path):
                 file_path = os.path.join(folder_path, filename)
+                if os.path.isfile(file_path) and filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    try:
+                        files[filename] = file_sha256(file_path)
+                    except FileNotFoundError:
+                        # Removed by a newer upload since the folder was listed
+                        continue
+
+            current = read_generation(QDRANT_PATH)
+            current_path = os.path.join(QDRANT_PATH, current) if current else None
+            if current_path is None or not os.path.isdir(current_path):
+                current_path = None
+            if current_path and read_embedding_identity(current_path) != embedding_identity():
+                # Vectors from different models cannot share a collection
+                logger.info("Embedding model changed, rebuilding the collection from scratch")
+                current_path = None
+            manifest = load_manifest(current_path) if current_path else {}
+
+            stale_files = {name: h for name, h in manifest.items() if files.get(name) != h}
+            new_files = [name for name, h in files.items() if manifest.get(name) != h]
+            if not stale_files and not new_files:
+                logger.info("Vector database is already up to date")
+                prune_generations(QDRANT_PATH, current, GENERATION_GRACE_SECONDS)
+                return
+
+            generation = new_generation()
+            storage_path = os.path.join(QDRANT_PATH, generation)
+            # Nothing points at the generation until it is published, so a failed build is discarded
+            try:
+                if current_path:
+                    shutil.copytree(current_path, storage_path, ignore=shutil.ignore_patterns(".lock", "RETIRED"))
+                else:
+                    os.makedirs(storage_path)
+
+                if stale_files:
+                    job.update(stage="deleting")
+                    client = QdrantClient(path=storage_path)
+                    try:
+                        if client.collection_exists(COLLECTION_NAME):
+                            client.delete(
+                                collection_name=COLLECTION_NAME,
+                                points_selector=stale_points_filter(folder_path, stale_files),
+                            )
+                    finally:
+                        client.close()
+                    logger.info(f"Removed points of {len(stale_files)} changed or deleted files")
+
+                job.update(stage="ingesting")
+                new_paths = [os.path.join(folder_path, filename) for filename in new_files]
+                chunk_count = 0
+                vectordb = None
+                try:
+                    for batch in itertools.batched(self.iter_chunks(new_paths, files, job), UPSERT_BATCH_SIZE):
+                        prefixed_chunks = self.add_prefix_to_documents(list(batch))
+                        if vectordb is None:
+                            # Creates the collection on first use
+                            vectordb = QdrantVectorStore.from_documents(
+                                documents=prefixed_chunks,
+                                collection_name=COLLECTION_NAME,
+                                embedding=self.dense_embeddings,
+                                sparse_embedding=self.sparse_embeddings,
+                                prefer_grpc=False,
+                                path=storage_path,
+                                retrieval_mode=RetrievalMode.HYBRID,
+                                batch_size=UPSERT_BATCH_SIZE,
+                            )
+                        else:
+                            vectordb.add_documents(prefixed_chunks, batch_size=UPSERT_BATCH_SIZE)
+                        chunk_count += len(prefixed_chunks)
+                        job.add(chunks_embedded=len(prefixed_chunks))
+                finally:
+                    # Release the storage lock before announcing the new data to readers
+                    if vectordb is not None:
+                        vectordb.client.close()
+
+                job.update(stage="validating")
+                self.validate_generation(
+                    storage_path, files, [files[name] for name in new_files], chunk_count
+                )
+
+                job.update(stage="publishing")
+                save_manifest(storage_path, files)
+                save_embedding_identity(storage_path)
+            except BaseException:
+                shutil.rmtree(storage_path, ignore_errors=True)
+                raise
 
-                if not os.path.isfile(file_path):
-                    continue
-
-                if filename.lower().endswith('.pdf'):
-                    loader = PDFPlumberLoader(file_path)
-                    documents = loader.load()
-                    all_documents.extend(documents)
-                elif filename.lower().endswith('.html'):
-                    loader = UnstructuredHTMLLoader(file_path)
-                    documents = loader.load()
-                    all_documents.extend(documents)
-
-            if all_documents:
-                chunks = self.chunking(all_documents)
-                prefixed_chunks = self.add_prefix_to_documents(chunks)
-                QdrantVectorStore.from_documents(
-                    documents=prefixed_chunks,
-                    collection_name="qdrantdb",
-                    embedding=self.dense_embeddings,
-                    sparse_embedding=self.sparse_embeddings,
-                    prefer_grpc=False,
-                    path="./qdrant",
-                    retrieval_mode=RetrievalMode.HYBRID,
+            publish_generation(QDRANT_PATH, generation)
+            # Readers may still be serving the previous generation until the grace period ends
+            if current:
+                retire_generation(QDRANT_PATH, current)
+            prune_generations(QDRANT_PATH, generation, GENERATION_GRACE_SECONDS)
+            logger.info(f"Published vector database generation {generation}")
+            print(f"{chunk_count} documents added to the vector store.")
+            logger.info(f"Embedding throughput: {self.embedding_executor.stats(since=embedding_stats)}")
+            if isinstance(self.dense_embeddings, ContentHashEmbeddings):
+                logger.info(
+                    f"Embedding cache: {self.dense_embeddings.hits} hits, "
+                    f"{self.dense_embeddings.misses} misses"
                 )
-                print(f"{len(chunks)} documents added to the vector store.")
         except Exception as e:
             raise e
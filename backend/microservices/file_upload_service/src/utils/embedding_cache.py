@@ -0,0 +1,70 @@
+import os
+import hashlib
+from collections import OrderedDict
+from typing import List, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Maximum number of document vectors kept in memory during an ingestion
+EMBEDDING_CACHE_SIZE = int(os.getenv("INGEST_EMBEDDING_CACHE_SIZE", "50000"))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ContentHashEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that remembers document vectors by the SHA-256 of their text.
+
+    Vectors derived elsewhere, such as pooled sentence windows, are seeded in under
+    the exact text the vector store will embed, so that text is not sent to the
+    embedding provider. Anything else is embedded once per instance.
+    """
+    def __init__(self, embeddings: Embeddings, maxsize: int = EMBEDDING_CACHE_SIZE) -> None:
+        self.embeddings = embeddings
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._vectors = OrderedDict()
+
+
+    def seed(self, text: str, vector: Sequence[float]) -> None:
+        """
+        Store a precomputed vector for the text.
+
+        Args:
+            text (str): Exact text the vector stands for
+            vector (Sequence[float]): Its embedding
+        """
+        self._store(content_hash(text), vector)
+
+
+    def _store(self, key: str, vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        self._vectors[key] = array
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.maxsize:
+            self._vectors.popitem(last=False)
+        return array
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [content_hash(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._vectors and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        vectors = {key: self._vectors[key] for key in keys if key in self._vectors}
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            for key, vector in zip(missing.keys(), embedded):
+                vectors[key] = self._store(key, vector)
+        return [vectors[key].tolist() for key in keys]
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
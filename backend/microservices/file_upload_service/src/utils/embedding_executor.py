@@ -0,0 +1,166 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("INGEST_EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF = float(os.getenv("INGEST_EMBED_BACKOFF", "1.0"))
+EMBED_MAX_BACKOFF = 30.0
+# Provider responses worth retrying: rate limiting and server-side failures
+RETRY_STATUS_CODES = {408, 429}
+
+
+def error_status_code(error: Exception) -> Optional[int]:
+    """
+    Find the HTTP status code behind an embedding provider error.
+
+    Clients expose it as `status_code` on the error or its `response`; the Nomic
+    client raises a bare `Exception((status_code, body))`.
+    """
+    for source in (error, getattr(error, "response", None)):
+        code = getattr(source, "status_code", None) or getattr(source, "status", None)
+        if isinstance(code, int):
+            return code
+    if error.args and isinstance(error.args[0], tuple) and error.args[0]:
+        code = error.args[0][0]
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Decide whether a failed embedding call is worth retrying.
+
+    Timeouts, dropped connections, 429 and 5xx responses are retried; anything else,
+    such as authentication or validation errors, fails immediately.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    if "Timeout" in name or name in ("ConnectError", "ReadError", "RemoteProtocolError"):
+        # requests, httpx and aiohttp timeouts and connection failures
+        return True
+    code = error_status_code(error)
+    return code is not None and (code in RETRY_STATUS_CODES or code >= 500)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for throughput reporting (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class EmbeddingExecutor(Embeddings):
+    """
+    Embeddings wrapper that splits document lists into batches, embeds a bounded
+    number of batches concurrently, and retries failed batches with jittered
+    exponential backoff. Results are returned in input order.
+
+    Only transient errors are retried, see `is_transient`. One executor is shared
+    by every ingestion job: `start` and `close` it in the application lifespan.
+    """
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = EMBED_BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        max_retries: int = EMBED_MAX_RETRIES,
+        backoff: float = EMBED_BACKOFF,
+    ) -> None:
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.texts = 0
+        self.tokens = 0
+        self.retries = 0
+        self.seconds = 0.0
+        self.concurrency = concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="embed"
+            )
+
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                delay = random.uniform(0, min(EMBED_MAX_BACKOFF, self.backoff * 2 ** attempt))
+                logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self._executor is None:
+            vectors = [vector for batch in batches for vector in self._embed_batch(batch)]
+        else:
+            vectors = []
+            for batch_vectors in self._executor.map(self._embed_batch, batches):
+                vectors.extend(batch_vectors)
+        with self._lock:
+            self.seconds += time.perf_counter() - start
+            self.texts += len(texts)
+            self.tokens += sum(estimate_tokens(text) for text in texts)
+        return vectors
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+    def stats(self, since: Optional[dict] = None) -> dict:
+        """
+        Throughput of the `embed_documents` calls so far.
+
+        Args:
+            since (dict, optional): Earlier `stats()` result; only the calls made
+                after it are counted
+
+        Returns:
+            dict: Texts and estimated tokens embedded, retries, seconds spent
+                embedding, and rates per second
+        """
+        since = since or {}
+        with self._lock:
+            texts = self.texts - since.get("texts", 0)
+            tokens = self.tokens - since.get("tokens", 0)
+            retries = self.retries - since.get("retries", 0)
+            elapsed = self.seconds - since.get("seconds", 0.0)
+        seconds = elapsed or float("inf")
+        return {
+            "texts": texts,
+            "tokens": tokens,
+            "retries": retries,
+            "seconds": elapsed,
+            "texts_per_second": round(texts / seconds, 1),
+            "tokens_per_second": round(tokens / seconds, 1),
+        }
+
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
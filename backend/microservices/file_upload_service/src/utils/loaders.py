@@ -0,0 +1,171 @@
+"""Document loaders that can run in worker processes."""
+import os
+from typing import List, Tuple
+
+import pdfplumber
+import pypdfium2 as pdfium
+from langchain_community.document_loaders import UnstructuredHTMLLoader
+from langchain_core.documents import Document
+
+# PDF text extraction backend: "pdfium" (fast, text only), "pdfplumber" (layout and
+# table aware) or "auto" to pick per file
+PDF_BACKEND = os.getenv("INGEST_PDF_BACKEND", "auto")
+# A sampled page with at least this many ruling lines and rectangle edges is treated as tabular
+TABLE_EDGE_THRESHOLD = 20
+TABLE_SAMPLE_PAGES = 3
+
+# Unit of work: (file path, first page, page after the last one, PDF backend);
+# pages and backend are None for non-PDF files
+LoadTask = Tuple[str, int, int, str]
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def choose_pdf_backend(file_path: str, total_pages: int) -> str:
+    """
+    Pick the extraction backend for a PDF.
+
+    With `INGEST_PDF_BACKEND=auto`, a few pages spread across the document are
+    sampled with pdfplumber; documents whose pages are dominated by ruling lines
+    (tables, forms) keep the layout-aware pdfplumber backend and all others use
+    the much faster pdfium text extraction.
+
+    Args:
+        file_path (str): Path to the PDF
+        total_pages (int): Number of pages in the PDF
+
+    Returns:
+        str: Name of the backend in `PDF_BACKENDS`
+    """
+    if PDF_BACKEND != "auto":
+        return PDF_BACKEND
+    if total_pages == 0:
+        return "pdfium"
+    step = max(1, total_pages // TABLE_SAMPLE_PAGES)
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(0, total_pages, step)[:TABLE_SAMPLE_PAGES]:
+            page = pdf.pages[index]
+            tabular = len(page.edges) >= TABLE_EDGE_THRESHOLD
+            page.close()
+            if tabular:
+                return "pdfplumber"
+    return "pdfium"
+
+
+def split_tasks(file_path: str, pages_per_task: int) -> List[LoadTask]:
+    """
+    Split a file into independently loadable tasks.
+
+    PDFs are split into ranges of at most `pages_per_task` pages; other
+    files are loaded as a whole.
+
+    Args:
+        file_path (str): Path to the file
+        pages_per_task (int): Maximum number of PDF pages per task
+
+    Returns:
+        List[LoadTask]: Tasks covering the whole file
+    """
+    if not file_path.lower().endswith(".pdf"):
+        return [(file_path, None, None, None)]
+    total_pages = count_pdf_pages(file_path)
+    backend = choose_pdf_backend(file_path, total_pages)
+    return [
+        (file_path, start, min(start + pages_per_task, total_pages), backend)
+        for start in range(0, total_pages, pages_per_task)
+    ]
+
+
+def load_pdf_pages_pdfplumber(file_path: str, start: int, stop: int) -> List[Document]:
+    """
+    Extract the text of a range of PDF pages with pdfplumber, one document per page.
+    Metadata matches `PDFPlumberLoader`: `source`, `file_path`, zero-based `page`
+    and `total_pages`.
+    """
+    documents = []
+    with pdfplumber.open(file_path) as pdf:
+        total_pages = len(pdf.pages)
+        for page in pdf.pages[start:stop]:
+            documents.append(
+                Document(
+                    page_content=page.extract_text() or "",
+                    metadata={
+                        "source": file_path,
+                        "file_path": file_path,
+                        "page": page.page_number - 1,
+                        "total_pages": total_pages,
+                    },
+                )
+            )
+            page.close()
+    return documents
+
+
+def load_pdf_pages_pdfium(file_path: str, start: int, stop: int) -> List[Document]:
+    """
+    Extract the text of a range of PDF pages with pypdfium2, one document per page.
+    Text only, without layout analysis; metadata is the same as the pdfplumber backend.
+    """
+    documents = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        total_pages = len(pdf)
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_bounded()
+            textpage.close()
+            page.close()
+            documents.append(
+                Document(
+                    page_content=text.replace("\r\n", "\n"),
+                    metadata={
+                        "source": file_path,
+                        "file_path": file_path,
+                        "page": index,
+                        "total_pages": total_pages,
+                    },
+                )
+            )
+    finally:
+        pdf.close()
+    return documents
+
+
+PDF_BACKENDS = {
+    "pdfplumber": load_pdf_pages_pdfplumber,
+    "pdfium": load_pdf_pages_pdfium,
+}
+
+# Fail at startup rather than in a worker halfway through an ingest
+if PDF_BACKEND != "auto" and PDF_BACKEND not in PDF_BACKENDS:
+    raise ValueError(
+        f"Unknown INGEST_PDF_BACKEND {PDF_BACKEND!r}; "
+        f"expected 'auto' or one of {', '.join(sorted(PDF_BACKENDS))}"
+    )
+
+
+def run_task(task: LoadTask) -> Tuple[str, List[Document]]:
+    """
+    Load the documents described by a task. Runs in a worker process.
+
+    Args:
+        task (LoadTask): File path and page range to load
+
+    Returns:
+        Tuple[str, List[Document]]: Filename and the loaded documents
+    """
+    file_path, start, stop, backend = task
+    filename = os.path.basename(file_path)
+    if filename.lower().endswith(".pdf"):
+        return filename, PDF_BACKENDS[backend](file_path, start, stop)
+    elif filename.lower().endswith(".html"):
+        return filename, UnstructuredHTMLLoader(file_path).load()
+    return filename, []
@@ -4,84 +4,63 @@ import re
 from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, cast
 
 import numpy as np
-from langchain_community.utils.math import (
-    cosine_similarity,
-)
 from langchain_core.documents import BaseDocumentTransformer, Document
 from langchain_core.embeddings import Embeddings
 
 
-def combine_sentences(sentences: List[dict], buffer_size: int = 1) -> List[dict]:
-    """Combine sentences based on buffer size.
+def sentence_offsets(sentences: List[str]) -> Tuple[str, np.ndarray, np.ndarray]:
+    """Join sentences with single spaces and locate each one in the result.
 
     Args:
-        sentences: List of sentences to combine.
-        buffer_size: Number of sentences to combine. Defaults to 1.
+        sentences: List of sentences.
 
     Returns:
-        List of sentences with combined sentences.
+        Tuple of the joined text and the start and end offsets of every sentence,
+        so that ``" ".join(sentences[i:j]) == text[starts[i]:ends[j - 1]]``.
     """
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.int64, count=len(sentences))
+    ends = np.cumsum(lengths + 1) - 1
+    starts = ends - lengths
+    return " ".join(sentences), starts, ends
 
-    # Go through each sentence dict
-    for i in range(len(sentences)):
-        # Create a string that will hold the sentences which are joined
-        combined_sentence = ""
-
-        # Add sentences before the current one, based on the buffer size.
-        for j in range(i - buffer_size, i):
-            # Check if the index j is not negative
-            # (to avoid index out of range like on the first one)
-            if j >= 0:
-                # Add the sentence at index j to the combined_sentence string
-                combined_sentence += sentences[j]["sentence"] + " "
-
-        # Add the current sentence
-        combined_sentence += sentences[i]["sentence"]
-
-        # Add sentences after the current one, based on the buffer size
-        for j in range(i + 1, i + 1 + buffer_size):
-            # Check if the index j is within the range of the sentences list
-            if j < len(sentences):
-                # Add the sentence at index j to the combined_sentence string
-                combined_sentence += " " + sentences[j]["sentence"]
-
-        # Then add the whole thing to your dict
-        # Store the combined sentence in the current sentence dict
-        sentences[i]["combined_sentence"] = combined_sentence
-
-    return sentences
 
+def combine_sentences(sentences: List[str], buffer_size: int = 1) -> List[str]:
+    """Combine sentences based on buffer size.
 
-def calculate_cosine_distances(sentences: List[dict]) -> Tuple[List[float], List[dict]]:
-    """Calculate cosine distances between sentences.
+    Each window is sliced out of the joined text rather than built by
+    repeated concatenation.
 
     Args:
-        sentences: List of sentences to calculate distances for.
+        sentences: List of sentences to combine.
+        buffer_size: Number of sentences to combine. Defaults to 1.
 
     Returns:
-        Tuple of distances and sentences.
+        List with, for every sentence, the sentence joined with up to
+        ``buffer_size`` neighbours on each side.
     """
-    distances = []
-    for i in range(len(sentences) - 1):
-        embedding_current = sentences[i]["combined_sentence_embedding"]
-        embedding_next = sentences[i + 1]["combined_sentence_embedding"]
-
-        # Calculate cosine similarity
-        similarity = cosine_similarity([embedding_current], [embedding_next])[0][0]
-
-        # Convert to cosine distance
-        distance = 1 - similarity
+    text, starts, ends = sentence_offsets(sentences)
+    count = len(sentences)
+    first = np.maximum(np.arange(count) - buffer_size, 0)
+    last = np.minimum(np.arange(count) + buffer_size, count - 1)
+    return [text[a:b] for a, b in zip(starts[first].tolist(), ends[last].tolist())]
 
-        # Append cosine distance to the list
-        distances.append(distance)
 
-        # Store distance in the dictionary
-        sentences[i]["distance_to_next"] = distance
+def calculate_cosine_distances(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """Calculate cosine distances between adjacent embeddings.
 
-    # Optionally handle the last sentence
-    # sentences[-1]['distance_to_next'] = None  # or a default value
+    Args:
+        embeddings: One embedding per sentence window.
 
-    return distances, sentences
+    Returns:
+        Array with the distance between every embedding and the next one.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors have similarity 0 to everything, as in `cosine_similarity`
+    norms[norms == 0] = 1.0
+    unit = matrix / norms
+    similarity = np.einsum("ij,ij->i", unit[:-1], unit[1:])
+    return 1.0 - similarity
 
 
 BreakpointThresholdType = Literal[
@@ -122,8 +101,8 @@ class SemanticChunker(BaseDocumentTransformer):
         self.min_chunk_size = min_chunk_size
 
     def _calculate_breakpoint_threshold(
-        self, distances: List[float]
-    ) -> Tuple[float, List[float]]:
+        self, distances: np.ndarray
+    ) -> Tuple[float, np.ndarray]:
         if self.breakpoint_threshold_type == "percentile":
             return cast(
                 float,
@@ -155,7 +134,7 @@ class SemanticChunker(BaseDocumentTransformer):
                 f"{self.breakpoint_threshold_type}"
             )
 
-    def _threshold_from_clusters(self, distances: List[float]) -> float:
+    def _threshold_from_clusters(self, distances: np.ndarray) -> float:
         """
         Calculate the threshold based on the number of chunks.
         Inverse of percentile method.
@@ -181,39 +160,54 @@ class SemanticChunker(BaseDocumentTransformer):
 
     def _calculate_sentence_distances(
         self, single_sentences_list: List[str]
-    ) -> Tuple[List[float], List[dict]]:
-        """Split text into multiple components."""
-
-        _sentences = [
-            {"sentence": x, "index": i} for i, x in enumerate(single_sentences_list)
-        ]
-        sentences = combine_sentences(_sentences, self.buffer_size)
-        embeddings = self.embeddings.embed_documents(
-            [x["combined_sentence"] for x in sentences]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed the sentence windows and return the distances between neighbours
+        together with the window embedding matrix."""
+        combined_sentences = combine_sentences(single_sentences_list, self.buffer_size)
+        embeddings = np.asarray(
+            self.embeddings.embed_documents(combined_sentences), dtype=np.float64
         )
-        for i, sentence in enumerate(sentences):
-            sentence["combined_sentence_embedding"] = embeddings[i]
-
-        return calculate_cosine_distances(sentences)
+        return calculate_cosine_distances(embeddings), embeddings
 
     def split_text(
         self,
         text: str,
     ) -> List[str]:
+        return [chunk for chunk, _ in self._split_text(text, pool_embeddings=False)]
+
+    def split_text_with_embeddings(
+        self,
+        text: str,
+    ) -> List[Tuple[str, Optional[List[float]]]]:
+        """Split text and pool the sentence window embeddings of every chunk.
+
+        The vector of a chunk is the normalized mean of the normalized window
+        embeddings of its sentences. It is None when the text was returned
+        without computing embeddings.
+        """
+        return self._split_text(text, pool_embeddings=True)
+
+    def _split_text(
+        self,
+        text: str,
+        pool_embeddings: bool,
+    ) -> List[Tuple[str, Optional[List[float]]]]:
         # Splitting the essay (by default on '.', '?', and '!')
         single_sentences_list = re.split(self.sentence_split_regex, text)
 
         # having len(single_sentences_list) == 1 would cause the following
         # np.percentile to fail.
         if len(single_sentences_list) == 1:
-            return single_sentences_list
+            return [(chunk, None) for chunk in single_sentences_list]
         # similarly, the following np.gradient would fail
         if (
             self.breakpoint_threshold_type == "gradient"
             and len(single_sentences_list) == 2
         ):
-            return single_sentences_list
-        distances, sentences = self._calculate_sentence_distances(single_sentences_list)
+            return [(chunk, None) for chunk in single_sentences_list]
+        distances, embeddings = self._calculate_sentence_distances(
+            single_sentences_list
+        )
         if self.number_of_chunks is not None:
             breakpoint_distance_threshold = self._threshold_from_clusters(distances)
             breakpoint_array = distances
@@ -223,13 +217,14 @@ class SemanticChunker(BaseDocumentTransformer):
                 breakpoint_array,
             ) = self._calculate_breakpoint_threshold(distances)
 
-        indices_above_thresh = [
-            i
-            for i, x in enumerate(breakpoint_array)
-            if x > breakpoint_distance_threshold
-        ]
+        indices_above_thresh = np.flatnonzero(
+            np.asarray(breakpoint_array) > breakpoint_distance_threshold
+        ).tolist()
 
+        # Chunks are slices of the joined text, located through sentence offsets
+        text, starts, ends = sentence_offsets(single_sentences_list)
         chunks = []
+        sentence_ranges = []
         start_index = 0
 
         # Iterate through the breakpoints to slice the sentences
@@ -237,9 +232,8 @@ class SemanticChunker(BaseDocumentTransformer):
             # The end index is the current breakpoint
             end_index = index
 
-            # Slice the sentence_dicts from the current start index to the end index
-            group = sentences[start_index : end_index + 1]
-            combined_text = " ".join([d["sentence"] for d in group])
+            # Slice the sentences from the current start index to the end index
+            combined_text = text[starts[start_index] : ends[end_index]]
             # If specified, merge together small chunks.
             if (
                 self.min_chunk_size is not None
@@ -247,15 +241,30 @@ class SemanticChunker(BaseDocumentTransformer):
             ):
                 continue
             chunks.append(combined_text)
+            sentence_ranges.append((start_index, end_index + 1))
 
             # Update the start index for the next group
             start_index = index + 1
 
         # The last group, if any sentences remain
-        if start_index < len(sentences):
-            combined_text = " ".join([d["sentence"] for d in sentences[start_index:]])
-            chunks.append(combined_text)
-        return chunks
+        if start_index < len(single_sentences_list):
+            chunks.append(text[starts[start_index] :])
+            sentence_ranges.append((start_index, len(single_sentences_list)))
+        if not pool_embeddings:
+            return [(chunk, None) for chunk in chunks]
+
+        # Mean of each sentence range from prefix sums of the unit window vectors
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        prefix = np.vstack(
+            [np.zeros((1, embeddings.shape[1])), np.cumsum(embeddings / norms, axis=0)]
+        )
+        bounds = np.asarray(sentence_ranges)
+        pooled = prefix[bounds[:, 1]] - prefix[bounds[:, 0]]
+        pooled_norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        pooled_norms[pooled_norms == 0] = 1.0
+        pooled = pooled / pooled_norms
+        return list(zip(chunks, pooled.tolist()))
 
     def create_documents(
         self, texts: List[str], metadatas: Optional[List[dict]] = None
@@ -274,6 +283,22 @@ class SemanticChunker(BaseDocumentTransformer):
                 start_index += len(chunk)
         return documents
 
+    def split_documents_with_embeddings(
+        self, documents: Iterable[Document]
+    ) -> Tuple[List[Document], List[Optional[List[float]]]]:
+        """Split documents and return the pooled embedding of every chunk."""
+        chunks, vectors = [], []
+        for doc in documents:
+            start_index = 0
+            for chunk, vector in self.split_text_with_embeddings(doc.page_content):
+                metadata = copy.deepcopy(doc.metadata)
+                if self._add_start_index:
+                    metadata["start_index"] = start_index
+                chunks.append(Document(page_content=chunk, metadata=metadata))
+                vectors.append(vector)
+                start_index += len(chunk)
+        return chunks, vectors
+
     def split_documents(self, documents: Iterable[Document]) -> List[Document]:
         """Split documents."""
         texts, metadatas = [], []
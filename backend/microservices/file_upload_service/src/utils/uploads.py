@@ -0,0 +1,153 @@
+import os
+import hashlib
+import tempfile
+from python_multipart.multipart import MultipartParser, parse_options_header
+from .utils import UploadTooLargeError
+
+
+class MultipartUploadWriter:
+    """
+    Incremental multipart/form-data parser that writes file parts straight to disk.
+
+    The request body is fed in as it arrives, so the per-file and per-request size
+    limits are enforced while the upload is still being received, whatever the
+    transfer encoding. Each file part of `field_name` is written to a hidden
+    `.partial` file in `folder` and hashed on the fly; other form fields are ignored.
+    Call `discard` if anything goes wrong to remove every partial file.
+    """
+    def __init__(self, content_type, folder, max_file_bytes, max_request_bytes, field_name="files"):
+        content_type, params = parse_options_header(content_type or "")
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+        self.folder = folder
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.field_name = field_name
+        # (filename, partial file path, size in bytes, SHA-256 hex digest)
+        self.files = []
+        self.received = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._out = None
+        self._part = None
+        self._ended = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+
+    def feed(self, data):
+        """
+        Parse the next piece of the request body.
+
+        Args:
+            data (bytes): Raw body bytes, in order
+
+        Raises:
+            UploadTooLargeError: If the request or the current file exceeds its limit
+        """
+        self.received += len(data)
+        if self.received > self.max_request_bytes:
+            raise UploadTooLargeError(
+                f"Upload exceeds the request size limit of {self.max_request_bytes} bytes"
+            )
+        self._parser.write(data)
+
+
+    def finish(self):
+        """
+        Check that the body ended cleanly.
+
+        Returns:
+            list: (filename, partial file path, size, digest) for every file received
+
+        Raises:
+            ValueError: If the body ended before the closing boundary
+        """
+        self._parser.finalize()
+        if not self._ended:
+            raise ValueError("Upload ended before the multipart body was complete")
+        return self.files
+
+
+    def discard(self):
+        """Remove every partial file written so far."""
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        paths = [path for _, path, _, _ in self.files]
+        if self._part is not None:
+            paths.append(self._part[1])
+            self._part = None
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self.files = []
+
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+
+    def _on_headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = params.get(b"filename")
+        if params.get(b"name") != self.field_name.encode() or not filename:
+            return
+        filename = os.path.basename(filename.decode("utf-8", "replace"))
+        if not filename:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=".", suffix=".partial")
+        self._out = os.fdopen(fd, "wb")
+        # [filename, partial path, size, digest]
+        self._part = [filename, tmp_path, 0, hashlib.sha256()]
+
+
+    def _on_part_data(self, data, start, end):
+        if self._out is None:
+            return
+        block = data[start:end]
+        self._part[2] += len(block)
+        if self._part[2] > self.max_file_bytes:
+            raise UploadTooLargeError(
+                f"{self._part[0]} exceeds the upload limit of {self.max_file_bytes} bytes"
+            )
+        self._part[3].update(block)
+        self._out.write(block)
+
+
+    def _on_part_end(self):
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        filename, tmp_path, size, digest = self._part
+        self._part = None
+        self.files.append((filename, tmp_path, size, digest.hexdigest()))
+
+
+    def _on_end(self):
+        self._ended = True
@@ -1,13 +1,14 @@
 import os
+import json
+import time
 import shutil
+import hashlib
 from langchain_qdrant import FastEmbedSparse
-from langchain_nomic import NomicEmbeddings
-
-os.environ["NOMIC_API_KEY"] = os.getenv("NOMIC_API_KEY")
+from .embeddings import load_dense_embeddings
 
 
 def load_embedding_models():
-    dense_embeddings = NomicEmbeddings(model="nomic-embed-text-v1.5")
+    dense_embeddings = load_dense_embeddings()
     sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
     return dense_embeddings, sparse_embeddings
 
@@ -26,4 +27,192 @@ def clean_folder(folder):
             elif os.path.isdir(file_path):
                 shutil.rmtree(file_path)
         except Exception as e:
-            print(f'Failed to delete {file_path}. Reason: {e}')
\ No newline at end of file
+            print(f'Failed to delete {file_path}. Reason: {e}')
+
+
+def remove_unlisted_files(folder, keep, extensions):
+    """
+    Delete the documents in a folder that are not in the given set, so the folder
+    holds exactly the latest upload. Hidden files, such as uploads still being
+    received, are left alone.
+
+    Args:
+        folder (str): Path to the upload folder
+        keep (Iterable[str]): Filenames to keep
+        extensions (Tuple[str, ...]): Extensions of the documents the folder may hold
+
+    Returns:
+        List[str]: Names of the removed files
+    """
+    keep = set(keep)
+    removed = []
+    for filename in os.listdir(folder):
+        file_path = os.path.join(folder, filename)
+        if (
+            filename in keep
+            or filename.startswith(".")
+            or not filename.lower().endswith(extensions)
+            or not os.path.isfile(file_path)
+        ):
+            continue
+        try:
+            os.unlink(file_path)
+            removed.append(filename)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds its configured size limit."""
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 digest of a file without loading it into memory.
+
+    Args:
+        file_path (str): Path to the file to hash
+        chunk_size (int): Number of bytes read at a time
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def new_generation():
+    """
+    Create a new, monotonically increasing generation id for the vector database.
+
+    Returns:
+        str: The new generation id
+    """
+    return str(time.time_ns())
+
+
+def read_generation(folder):
+    """
+    Read the generation id currently published in the specified folder.
+
+    Args:
+        folder (str): Path to the Qdrant storage folder
+
+    Returns:
+        str: The published generation id, or None if nothing has been published
+    """
+    try:
+        with open(os.path.join(folder, "GENERATION"), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_generation(folder, generation):
+    """
+    Atomically point readers at a generation of the vector database.
+    Readers watch this marker to detect that the collection has been rebuilt.
+
+    Args:
+        folder (str): Path to the Qdrant storage folder
+        generation (str): Generation id to publish
+    """
+    marker_path = os.path.join(folder, "GENERATION")
+    tmp_path = f"{marker_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(generation)
+    os.replace(tmp_path, marker_path)
+
+
+def retire_generation(folder, generation):
+    """
+    Record that a generation is no longer published; its grace period starts now.
+    The time is written to a `RETIRED` file inside the generation rather than taken
+    from the directory mtime, which copies and changes to the directory move.
+
+    Args:
+        folder (str): Path to the Qdrant storage folder
+        generation (str): Generation id that was replaced
+    """
+    path = os.path.join(folder, generation)
+    if not os.path.isdir(path) or retired_at(path) is not None:
+        return
+    tmp_path = os.path.join(path, "RETIRED.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(repr(time.time()))
+    os.replace(tmp_path, os.path.join(path, "RETIRED"))
+
+
+def retired_at(path):
+    """
+    Read when a generation was retired.
+
+    Args:
+        path (str): Path to the generation's storage directory
+
+    Returns:
+        float: Retirement time in seconds since the epoch, or None if it was never retired
+    """
+    try:
+        with open(os.path.join(path, "RETIRED"), "r") as f:
+            return float(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def prune_generations(folder, published, grace_seconds):
+    """
+    Remove generation directories that have not been published for longer than
+    the grace period, giving readers time to move off them. Directories without
+    a retirement record, from updates that never got published or from before
+    retirement was recorded, are aged from the creation time in their generation id.
+    Must be called while holding the ingestion lock, so no update is in flight.
+
+    Args:
+        folder (str): Path to the Qdrant storage folder
+        published (str): Generation id currently published, which is always kept
+        grace_seconds (float): Minimum time since retirement before a directory is removed
+    """
+    cutoff = time.time() - grace_seconds
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if not name.isdigit() or not os.path.isdir(path) or name == published:
+            continue
+        since = retired_at(path)
+        if since is None:
+            since = int(name) / 1e9
+        if since < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_manifest(storage_path):
+    """
+    Load the mapping of indexed filenames to content hashes for a generation.
+
+    Args:
+        storage_path (str): Path to the generation's storage directory
+
+    Returns:
+        dict: Filename to SHA-256 digest
+    """
+    try:
+        with open(os.path.join(storage_path, "manifest.json"), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(storage_path, manifest):
+    """
+    Save the mapping of indexed filenames to content hashes for a generation.
+
+    Args:
+        storage_path (str): Path to the generation's storage directory
+        manifest (dict): Filename to SHA-256 digest
+    """
+    with open(os.path.join(storage_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
@@ -0,0 +1,63 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+from src.utils.embedding_executor import EmbeddingExecutor, is_transient
+
+
+class FlakyEmbeddings(Embeddings):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+@pytest.mark.parametrize("error, transient", [
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (Exception((429, "rate limited")), True),
+    (Exception((503, "unavailable")), True),
+    (Exception((401, "invalid api key")), False),
+    (Exception((422, "bad input")), False),
+    (ValueError("bad input"), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_transient_errors_are_retried():
+    embeddings = FlakyEmbeddings([Exception((503, "unavailable"))])
+    executor = EmbeddingExecutor(embeddings, batch_size=2, backoff=0)
+    executor.start()
+    try:
+        assert executor.embed_documents(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+        assert executor.retries == 1
+    finally:
+        executor.close()
+
+
+def test_permanent_errors_fail_immediately():
+    embeddings = FlakyEmbeddings([Exception((401, "invalid api key"))])
+    executor = EmbeddingExecutor(embeddings, backoff=0)
+    with pytest.raises(Exception):
+        executor.embed_documents(["a"])
+    assert embeddings.calls == 1
+
+
+def test_stats_since_counts_only_later_calls():
+    embeddings = FlakyEmbeddings([])
+    executor = EmbeddingExecutor(embeddings, backoff=0)
+    executor.embed_documents(["a", "bb"])
+    before = executor.stats()
+    embeddings.errors.append(Exception((503, "unavailable")))
+    executor.embed_documents(["ccc"])
+
+    stats = executor.stats(since=before)
+    assert (stats["texts"], stats["retries"]) == (1, 1)
+    assert executor.stats()["texts"] == 3
@@ -0,0 +1,86 @@
+import os
+import hashlib
+from collections import Counter
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import SparseEmbeddings, SparseVector
+from qdrant_client import QdrantClient
+from bench.bench_pdf_backends import write_pdf
+from src import service
+from src.utils.embedding_executor import EmbeddingExecutor
+from src.utils.utils import read_generation, remove_unlisted_files
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [byte / 255 + 0.01 for byte in digest[:8]]
+
+
+class FakeSparse(SparseEmbeddings):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return SparseVector(indices=[len(text) % 1000], values=[1.0])
+
+
+@pytest.fixture
+def vectordb(tmp_path, monkeypatch):
+    # The real encoders need network access; the parse pool is not needed for small files
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(service, "FastEmbedSparse", FakeSparse)
+    monkeypatch.setattr(service, "embedding_executor", EmbeddingExecutor(FakeEmbeddings()))
+    monkeypatch.setattr(service, "PARSE_WORKERS", 1)
+    os.makedirs("uploads")
+    return service.VectorDB()
+
+
+def indexed_sources():
+    generation = read_generation(service.QDRANT_PATH)
+    client = QdrantClient(path=os.path.join(service.QDRANT_PATH, generation))
+    try:
+        points, _ = client.scroll(service.COLLECTION_NAME, limit=1000)
+    finally:
+        client.close()
+    return Counter(os.path.basename(p.payload["metadata"]["source"]) for p in points)
+
+
+def test_removed_file_points_are_dropped(vectordb):
+    write_pdf("uploads/a.pdf", 2)
+    write_pdf("uploads/b.pdf", 3)
+    vectordb.create_vectordb("uploads")
+    assert indexed_sources() == {"a.pdf": 2, "b.pdf": 3}
+
+    # A new upload of only a.pdf replaces the corpus
+    open("uploads/.upload.partial", "w").close()
+    assert remove_unlisted_files("uploads", ["a.pdf"], service.SUPPORTED_EXTENSIONS) == ["b.pdf"]
+    assert sorted(os.listdir("uploads")) == [".upload.partial", "a.pdf"]
+    vectordb.create_vectordb("uploads")
+
+    assert indexed_sources() == {"a.pdf": 2}
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    def embed_documents(self, texts):
+        raise RuntimeError("embedding provider down")
+
+
+def test_failed_build_leaves_no_generation_behind(vectordb):
+    write_pdf("uploads/a.pdf", 2)
+    vectordb.create_vectordb("uploads")
+    before = sorted(os.listdir(service.QDRANT_PATH))
+
+    write_pdf("uploads/b.pdf", 3)
+    vectordb.dense_embeddings = FailingEmbeddings()
+    with pytest.raises(RuntimeError):
+        vectordb.create_vectordb("uploads")
+
+    assert sorted(os.listdir(service.QDRANT_PATH)) == before
+    assert indexed_sources() == {"a.pdf": 2}
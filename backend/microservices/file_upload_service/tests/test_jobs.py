@@ -0,0 +1,65 @@
+import time
+import threading
+from src.jobs import JobManager
+
+
+def wait_until_finished(*jobs):
+    for _ in range(500):
+        if all(job.finished_at is not None for job in jobs):
+            return
+        time.sleep(0.01)
+    raise AssertionError("jobs did not finish")
+
+
+def test_jobs_report_completion_and_failure():
+    manager = JobManager(workers=1)
+
+    def fail(job):
+        raise ValueError("not a valid directory")
+
+    try:
+        done = manager.submit(["a.pdf"], lambda job: job.add(chunks_embedded=3))
+        failed = manager.submit(["b.pdf"], fail)
+        wait_until_finished(done, failed)
+    finally:
+        manager.shutdown()
+
+    assert done.to_dict()["status"] == "completed"
+    assert done.chunks_embedded == 3
+    assert (failed.status, failed.error) == ("failed", "not a valid directory")
+    assert manager.get(done.id) is done
+
+
+def test_full_queue_rejects_new_jobs():
+    manager = JobManager(workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        job = manager.submit(["a.pdf"], lambda job: release.wait(5))
+        assert manager.submit(["b.pdf"], lambda job: None) is None
+        release.set()
+        wait_until_finished(job)
+        assert manager.submit(["b.pdf"], lambda job: None) is not None
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_shutdown_cancels_queued_jobs():
+    manager = JobManager(workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    running = manager.submit(["a.pdf"], block)
+    queued = manager.submit(["b.pdf"], lambda job: None)
+    started.wait(5)
+    manager.shutdown()
+    release.set()
+    wait_until_finished(running, queued)
+
+    assert running.status == "completed"
+    assert queued.status == "cancelled"
+    assert queued.error == "Service shut down before the job started"
+    assert manager._pending == 0
@@ -0,0 +1,25 @@
+from qdrant_client import QdrantClient, models
+from src.service import stale_points_filter
+
+
+def test_identical_files_keep_their_points(tmp_path):
+    client = QdrantClient(path=str(tmp_path))
+    client.create_collection(
+        "test", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+    )
+    sources = ["uploads/a.pdf", "uploads/b.pdf", "uploads/c.pdf"]
+    hashes = ["same", "same", "other"]
+    client.upsert("test", points=[
+        models.PointStruct(
+            id=i, vector=[1.0, 0.0],
+            payload={"metadata": {"source": source, "content_hash": content_hash}},
+        )
+        for i, (source, content_hash) in enumerate(zip(sources, hashes))
+    ])
+
+    # a.pdf was edited; b.pdf has the same original contents and must survive
+    client.delete("test", points_selector=stale_points_filter("uploads", {"a.pdf": "same"}))
+
+    points, _ = client.scroll("test", limit=10)
+    assert sorted(p.payload["metadata"]["source"] for p in points) == sources[1:]
+    client.close()
@@ -0,0 +1,21 @@
+import pytest
+from bench.bench_text_splitter import HashedEmbeddings, LegacySemanticChunker, make_document
+from src.utils.text_splitter import BREAKPOINT_DEFAULTS, SemanticChunker
+
+SETTINGS = [{"breakpoint_threshold_type": kind} for kind in BREAKPOINT_DEFAULTS] + [
+    {"number_of_chunks": 20},
+    {"min_chunk_size": 800},
+    {"buffer_size": 3},
+]
+
+
+@pytest.mark.parametrize("options", SETTINGS)
+def test_chunks_match_previous_implementation(options):
+    text = make_document(500)
+    embeddings = HashedEmbeddings()
+
+    expected = LegacySemanticChunker(embeddings, **options).split_text(text)
+    chunker = SemanticChunker(embeddings, **options)
+
+    assert chunker.split_text(text) == expected
+    assert [chunk for chunk, _ in chunker.split_text_with_embeddings(text)] == expected
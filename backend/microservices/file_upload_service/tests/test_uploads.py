@@ -0,0 +1,64 @@
+import os
+import pytest
+from src.utils.uploads import MultipartUploadWriter
+from src.utils.utils import UploadTooLargeError
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart_body(*files):
+    body = b""
+    for filename, content in files:
+        body += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+            "Content-Type: application/pdf\r\n\r\n"
+        ).encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def feed_in_pieces(writer, body, size=7):
+    for i in range(0, len(body), size):
+        writer.feed(body[i:i + size])
+
+
+def test_files_are_written_and_hashed(tmp_path):
+    writer = MultipartUploadWriter(CONTENT_TYPE, tmp_path, 1024, 4096)
+    feed_in_pieces(writer, multipart_body(("a.pdf", b"first"), ("../b.pdf", b"second")))
+    files = writer.finish()
+
+    assert [(name, size) for name, _, size, _ in files] == [("a.pdf", 5), ("b.pdf", 6)]
+    assert open(files[1][1], "rb").read() == b"second"
+
+
+def test_file_limit_is_enforced_while_streaming(tmp_path):
+    writer = MultipartUploadWriter(CONTENT_TYPE, tmp_path, 10, 4096)
+    body = multipart_body(("a.pdf", b"ok"), ("big.pdf", b"x" * 100))
+    with pytest.raises(UploadTooLargeError):
+        # Fails before the end of the oversized part has been received
+        feed_in_pieces(writer, body[:-40])
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+
+
+def test_request_limit_counts_raw_body(tmp_path):
+    writer = MultipartUploadWriter(CONTENT_TYPE, tmp_path, 1024, 100)
+    with pytest.raises(UploadTooLargeError):
+        feed_in_pieces(writer, multipart_body(("a.pdf", b"x" * 200)))
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+
+
+def test_truncated_body_is_rejected(tmp_path):
+    writer = MultipartUploadWriter(CONTENT_TYPE, tmp_path, 1024, 4096)
+    writer.feed(multipart_body(("a.pdf", b"content"))[:-30])
+    with pytest.raises(ValueError):
+        writer.finish()
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+
+
+def test_non_multipart_body_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        MultipartUploadWriter("application/json", tmp_path, 1024, 4096)
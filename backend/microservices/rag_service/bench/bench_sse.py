@@ -0,0 +1,98 @@
+"""
+Frames, bytes and server CPU of an SSE token stream served over HTTP by uvicorn,
+one json.dumps frame per token (the previous behaviour) vs coalesced orjson frames.
+
+    python -m bench.bench_sse [tokens] [tokens_per_second]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import subprocess
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from src.services import sse
+
+TOKENS = int(os.getenv("BENCH_TOKENS", "2000"))
+RATE = float(os.getenv("BENCH_RATE", "400"))
+
+app = FastAPI()
+
+
+async def tokens():
+    delay = 1 / RATE if RATE else 0
+    for i in range(TOKENS):
+        if delay:
+            await asyncio.sleep(delay)
+        yield {"content": f"tok{i % 100} "}
+
+
+async def per_token_frames():
+    async for event in tokens():
+        yield f"data: {json.dumps(event)}\n\n"
+
+
+@app.get("/per-token")
+async def per_token():
+    return StreamingResponse(per_token_frames(), media_type="text/event-stream")
+
+
+@app.get("/coalesced")
+async def coalesced():
+    return sse.sse_response(tokens())
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench.bench_sse:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "BENCH_TOKENS": str(TOKENS), "BENCH_RATE": str(RATE)},
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{url}/docs")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        print(f"{TOKENS} tokens at {RATE or 'unlimited'} tokens/s, coalesce window {sse.SSE_COALESCE_MS} ms")
+        for name in ("per-token", "coalesced"):
+            cpu, wall = cpu_seconds(server.pid), time.perf_counter()
+            frames = size = 0
+            with httpx.stream("GET", f"{url}/{name}", timeout=None) as response:
+                for line in response.iter_lines():
+                    if line.startswith("data: "):
+                        frames += 1
+                        size += len(line) + 2
+            cpu, wall = cpu_seconds(server.pid) - cpu, time.perf_counter() - wall
+            print(
+                f"{name:>10}: {frames:6d} frames {size:8d} bytes "
+                f"{frames / wall:9.0f} frames/s  {cpu * 1000:6.0f} ms server CPU  {wall:.2f} s"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        TOKENS = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        RATE = float(sys.argv[2])
+    main()
@@ -1,15 +1,21 @@
-import json
+import os
 import logging
-import aiohttp
 from pathlib import Path
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
 from .entities import ChatRequest
-from .services.retriever import retrieve_documents
-from .services.generate import generate
+from .services.retriever import aretrieve_documents, aembed_question
+from .services.generate import generate, has_history, record_turn
+from .services.answer_cache import answer_cache, fingerprint
+from .services.search_client import stream_search
+from .services.context import CONTEXT_TOKEN_BUDGET, assemble_context, truncate_to_tokens
+from .services.sse import sse_response
 
 logger = logging.getLogger(__name__)
 
+# What to do when no document is relevant: "stream" forwards the web search answer
+# as it arrives, "regenerate" collects it and rewrites it with the RAG prompt
+FALLBACK_MODE = os.getenv("RAG_FALLBACK_MODE", "stream")
+
 router = APIRouter(
     prefix="/v1/rag",
     tags=["Documents"]
@@ -21,7 +27,8 @@ async def rag_stream(request: ChatRequest):
     """
     This endpoint implements a Retrieval-Augmented Generation (RAG) system that:
     1. Retrieves relevant documents from the vector database based on the question
-    2. Falls back to web search if no documents are found
+    2. Falls back to web search if no documents are found, streaming the search
+       answer through or regenerating from it depending on `RAG_FALLBACK_MODE`
     3. Provides citations for the sources used
     
     Args:
@@ -37,7 +44,7 @@ async def rag_stream(request: ChatRequest):
     async def generate_response():
         try:
             # Retrieve documents
-            docs, max_relevance = retrieve_documents(request.question)
+            docs, max_relevance, generation = await aretrieve_documents(request.question)
             logger.info(f"Max relevance: {max_relevance}")
             logger.info(f"Length of docs: {len(docs)}")
             
@@ -45,65 +52,82 @@ async def rag_stream(request: ChatRequest):
             context = ""
             
             if max_relevance >= 0.5:
-                # Build context from documents
-                page_contents = []
+                # Build a deduplicated, token-budgeted context from the documents
+                context, packed_docs, context_tokens = assemble_context(docs)
                 cite_hash = set()
                 
-                for doc in docs:
+                for doc in packed_docs:
                     key = (Path(doc.metadata["source"]).name, doc.metadata["page"])
                     if key not in cite_hash:
                         citations.append({"title": key[0], "citation": str(key[1])})
                         cite_hash.add(key)
-                    page_contents.append(doc.page_content)
-                
-                context = "\n".join(page_contents)
                 
             else:
                 # Fallback to web search
                 full_response = ""
                 urls = []
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        "http://search-service:8000/v1/search",
-                        json={
-                            "question": request.question,
-                            "chatId": request.chatId,
-                        }
-                    ) as response:
-                        # Handle Server-Sent Events (SSE) response
-                        async for line in response.content:
-                            line = line.decode('utf-8').strip()
-                            if line.startswith('data: '):
-                                try:
-                                    data = json.loads(line[6:])  # Remove 'data: ' prefix
-                                    if 'content' in data:
-                                        full_response += data['content']
-                                    elif 'citations' in data:
-                                        urls = data['citations']
-                                except json.JSONDecodeError:
-                                    logger.warning(f"Failed to parse SSE data: {line}")
+                async for data in stream_search(request.question, request.chatId):
+                    if 'content' in data:
+                        full_response += data['content']
+                        if FALLBACK_MODE == "stream":
+                            yield {'content': data['content']}
+                    elif 'citations' in data:
+                        urls = data['citations']
+                    elif 'error' in data:
+                        # Reported to the client by the handler below
+                        raise RuntimeError(f"Web search failed: {data['error']}")
 
-                context = full_response
+                if FALLBACK_MODE == "stream":
+                    # The answer never went through `generate`, so record it for follow-ups;
+                    # an empty answer would only leave a blank turn in the history
+                    if full_response.strip():
+                        await record_turn(request.question, full_response, request.chatId)
+                    else:
+                        logger.warning("Web search returned no content, not recording the turn")
+                    if urls:
+                        yield {'citations': urls}
+                    return
+
+                context, context_tokens = truncate_to_tokens(full_response, CONTEXT_TOKEN_BUDGET)
+                logger.info(f"Context: {context_tokens}/{CONTEXT_TOKEN_BUDGET} tokens from web search")
                 citations = urls
             
-            # Stream the generated response
-            async for chunk in generate(request.question, context, request.chatId):
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
-            
+            # Answers grounded in the documents may be served from the semantic cache,
+            # but only for the first turn of a conversation since follow-ups depend on history
+            use_answer_cache = (
+                answer_cache.enabled
+                and max_relevance >= 0.5
+                and not await has_history(request.chatId)
+            )
+            cached = None
+            if use_answer_cache:
+                question_vector = await aembed_question(request.question)
+                # Keyed on the generation the context came from, even if a newer one is served by now
+                context_fingerprint = fingerprint(context)
+                cached = answer_cache.lookup(question_vector, generation, context_fingerprint)
+
+            if cached:
+                answer, citations = cached
+                yield {'content': answer}
+                await record_turn(request.question, answer, request.chatId)
+            else:
+                # Stream the generated response
+                answer_chunks = []
+                async for chunk in generate(request.question, context, request.chatId):
+                    answer_chunks.append(chunk)
+                    yield {'content': chunk}
+                if use_answer_cache:
+                    answer_cache.store(
+                        question_vector, generation, context_fingerprint,
+                        "".join(answer_chunks), citations,
+                    )
+
             # Send citations at the end
             if citations:
-                yield f"data: {json.dumps({'citations': citations})}\n\n"
+                yield {'citations': citations}
                     
         except Exception as e:
             logger.error(f"Error in RAG streaming: {e}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield {'error': str(e)}
     
-    return StreamingResponse(
-        generate_response(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/event-stream",
-        }
-    )
\ No newline at end of file
+    return sse_response(generate_response())
\ No newline at end of file
@@ -1,8 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .controller import router as rag_router
+from .services.embedding_cache import (
+    load_embedding_caches,
+    save_embedding_caches,
+    start_cache_persistence,
+)
+from .services.retriever import dense_embeddings, sparse_embeddings
+from .services.search_client import http_client
+from .services.context import load_encoding
+from .services.storage import history_engine
+from .services import history
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_embedding_caches(dense_embeddings, sparse_embeddings)
+    cache_persistence = start_cache_persistence(dense_embeddings, sparse_embeddings)
+    await http_client.start()
+    await load_encoding()
+    yield
+    if cache_persistence is not None:
+        cache_persistence.cancel()
+    await http_client.close()
+    await history.close()
+    await history_engine.dispose()
+    save_embedding_caches(dense_embeddings, sparse_embeddings)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,118 @@
+import os
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600"))
+# Maximum number of distinct questions remembered for the same retrieved context
+ANSWERS_PER_CONTEXT = 8
+
+
+def fingerprint(context: str) -> str:
+    """
+    Fingerprint the retrieved context an answer was generated from.
+
+    Args:
+        context (str): Context passed to the LLM
+
+    Returns:
+        str: Hex digest identifying the context
+    """
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers looked up by question similarity.
+
+    Answers are grouped by the collection generation and the fingerprint of the
+    context they were generated from, so an entry is only ever replayed for the
+    same documents. Within a group the closest stored question wins if its
+    cosine similarity reaches the threshold.
+    """
+    def __init__(
+        self,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+    ) -> None:
+        self.enabled = enabled
+        self.threshold = threshold
+        self._groups = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = None
+
+
+    def _check_generation(self, generation: Optional[str]) -> None:
+        if generation != self._generation:
+            self._groups.clear()
+            self._generation = generation
+
+
+    def lookup(
+        self, vector: List[float], generation: Optional[str], context_fingerprint: str
+    ) -> Optional[Tuple[str, list]]:
+        """
+        Find a cached answer for a semantically equivalent question over the same context.
+
+        Args:
+            vector (List[float]): Embedding of the question
+            generation (Optional[str]): Collection generation the context was retrieved from
+            context_fingerprint (str): Fingerprint of the retrieved context
+
+        Returns:
+            Optional[Tuple[str, list]]: The cached answer and citations, or None on a miss
+        """
+        self._check_generation(generation)
+        group = self._groups.get(context_fingerprint)
+        if not group:
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        vectors = np.stack([entry[0] for entry in group])
+        similarities = vectors @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        logger.info(f"Semantic answer cache hit (similarity {similarities[best]:.3f})")
+        _, answer, citations = group[best]
+        return answer, citations
+
+
+    def store(
+        self,
+        vector: List[float],
+        generation: Optional[str],
+        context_fingerprint: str,
+        answer: str,
+        citations: list,
+    ) -> None:
+        """
+        Remember an answer generated for the question and context. Answers generated
+        from another generation than the one last looked up are dropped: the cache
+        has moved on to a newer collection since their context was retrieved.
+
+        Args:
+            vector (List[float]): Embedding of the question
+            generation (Optional[str]): Collection generation the context was retrieved from
+            context_fingerprint (str): Fingerprint of the retrieved context
+            answer (str): Full generated answer
+            citations (list): Citations sent with the answer
+        """
+        if not answer or generation != self._generation:
+            return
+        unit = np.asarray(vector, dtype=np.float32)
+        unit = unit / (np.linalg.norm(unit) or 1.0)
+        group = list(self._groups.get(context_fingerprint) or [])
+        group.append((unit, answer, citations))
+        self._groups.set(context_fingerprint, group[-ANSWERS_PER_CONTEXT:])
+
+
+answer_cache = SemanticAnswerCache()
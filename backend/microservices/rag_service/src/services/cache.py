@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every change, so callers can tell whether the cache needs saving
+        self.version = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self.version += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.version += 1
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+    def save(self, path: str, encode: Callable[[Any], Any] = lambda v: v) -> None:
+        """
+        Write the unexpired entries to a JSON file, oldest first.
+
+        Args:
+            path (str): Destination file
+            encode (Callable): Converts a cached value into a JSON-serializable object
+        """
+        now = time.time()
+        with self._lock:
+            entries = [
+                [list(key) if isinstance(key, tuple) else key, expires_at, encode(value)]
+                for key, (expires_at, value) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+
+    def load(self, path: str, decode: Callable[[Any], Any] = lambda v: v) -> None:
+        """
+        Restore entries previously written with `save`, skipping any that have expired.
+
+        Args:
+            path (str): Source file
+            decode (Callable): Converts a stored JSON object back into a cached value
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in entries:
+                if expires_at is not None and expires_at <= now:
+                    continue
+                key = tuple(key) if isinstance(key, list) else key
+                self._data[key] = (expires_at, decode(value))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
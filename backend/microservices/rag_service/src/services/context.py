@@ -0,0 +1,149 @@
+import os
+import re
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from .embeddings import DOCUMENT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of tokens of retrieved text placed in the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+# Chunks whose word shingles overlap at least this much (Jaccard) count as duplicates
+DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+# Llama's tokenizer is not available in tiktoken; cl100k_base is a close enough proxy for budgeting
+TOKEN_ENCODING = os.getenv("RAG_TOKEN_ENCODING", "cl100k_base")
+
+_encoding = None
+
+
+def _get_encoding():
+    """
+    Return the tiktoken encoding, or None if it cannot be loaded. The first load may
+    download the BPE file, so the application loads it at startup with `load_encoding`.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            logger.warning(f"Could not load tiktoken encoding {TOKEN_ENCODING}, estimating tokens: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+async def load_encoding() -> None:
+    """Load the tiktoken encoding off the event loop, before the first request needs it."""
+    await asyncio.to_thread(_get_encoding)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Token count, or an estimate of four characters per token when the
+            encoding is unavailable
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, int]:
+    """
+    Cut a text down to at most `max_tokens` tokens.
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Token budget
+
+    Returns:
+        Tuple[str, int]: The possibly shortened text and its token count
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        text = text[:max_tokens * 4]
+        return text, count_tokens(text)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+def strip_prefix(text: str) -> str:
+    """Remove the embedding task prefix added to every chunk at ingestion."""
+    return text[len(DOCUMENT_PREFIX):] if text.startswith(DOCUMENT_PREFIX) else text
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.casefold())
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def assemble_context(
+    documents: List[Document], budget: Optional[int] = None
+) -> Tuple[str, List[Document], int]:
+    """
+    Build the prompt context from reranked documents.
+
+    Ingest prefixes are stripped and near-duplicate chunks dropped. Chunks are
+    then taken from the most relevant down until the token budget is spent; a
+    most relevant chunk that alone exceeds the budget is truncated. The packed
+    chunks keep the ascending relevance order of `repack_documents`, so the
+    best match sits right before the question.
+
+    Args:
+        documents (List[Document]): Retrieved documents with a `relevance_score`
+        budget (Optional[int]): Token budget, `RAG_CONTEXT_TOKEN_BUDGET` by default
+
+    Returns:
+        Tuple[str, List[Document], int]: The context, the documents it contains
+            in context order, and its token count
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    ranked = sorted(
+        documents, key=lambda doc: doc.metadata.get("relevance_score", 0), reverse=True
+    )
+
+    selected, texts, seen, used = [], [], [], 0
+    for doc in ranked:
+        text = strip_prefix(doc.page_content).strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if any(_similarity(shingles, other) >= DEDUP_THRESHOLD for other in seen):
+            continue
+        # Separator newline included
+        tokens = count_tokens(text) + 1
+        if used + tokens > budget:
+            if selected:
+                continue
+            text, tokens = truncate_to_tokens(text, budget - 1)
+            tokens += 1
+        seen.append(shingles)
+        selected.append(doc)
+        texts.append(text)
+        used += tokens
+
+    selected.reverse()
+    texts.reverse()
+    logger.info(
+        f"Context: {used}/{budget} tokens from {len(selected)} of {len(documents)} chunks"
+    )
+    return "\n".join(texts), selected, used
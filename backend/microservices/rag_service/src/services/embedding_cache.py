@@ -0,0 +1,145 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant.sparse_embeddings import SparseEmbeddings, SparseVector
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("RAG_EMBEDDING_CACHE_TTL", "86400"))
+# Directory the caches are persisted to; persistence is off when unset
+EMBEDDING_CACHE_DIR = os.getenv("RAG_EMBEDDING_CACHE_DIR")
+# Seconds between saves of changed caches, so a crash or reload loses little
+EMBEDDING_CACHE_SAVE_INTERVAL = float(os.getenv("RAG_EMBEDDING_CACHE_SAVE_INTERVAL", "60"))
+
+
+def normalize_query(text: str) -> str:
+    """
+    Collapse runs of whitespace in a query. The result is both the cache key and
+    the text that is embedded, so every input sharing a key gets the same vector.
+    Case is kept, since it can change the dense embedding.
+
+    Args:
+        text (str): Query text
+
+    Returns:
+        str: Normalized query text
+    """
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Dense embeddings wrapper that caches query vectors by model and normalized text,
+    see `normalize_query`. Document embeddings are passed through unchanged.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional[TTLCache] = None) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+
+    def embed_query(self, text: str) -> List[float]:
+        text = normalize_query(text)
+        key = (self.model_name, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """
+    Sparse embeddings wrapper that caches query vectors by model and normalized text,
+    see `normalize_query`. Document embeddings are passed through unchanged.
+    """
+    def __init__(self, embeddings: SparseEmbeddings, model_name: str, cache: Optional[TTLCache] = None) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return self.embeddings.embed_documents(texts)
+
+
+    def embed_query(self, text: str) -> SparseVector:
+        text = normalize_query(text)
+        key = (self.model_name, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+
+def _encode_sparse(vector: SparseVector) -> dict:
+    return {"indices": list(vector.indices), "values": list(vector.values)}
+
+
+def _decode_sparse(data: dict) -> SparseVector:
+    return SparseVector(indices=data["indices"], values=data["values"])
+
+
+def load_embedding_caches(dense: CachedEmbeddings, sparse: CachedSparseEmbeddings) -> None:
+    """
+    Restore both query caches from `RAG_EMBEDDING_CACHE_DIR`, if configured.
+    """
+    if not EMBEDDING_CACHE_DIR:
+        return
+    dense.cache.load(os.path.join(EMBEDDING_CACHE_DIR, "dense.json"))
+    sparse.cache.load(os.path.join(EMBEDDING_CACHE_DIR, "sparse.json"), decode=_decode_sparse)
+    logger.info(f"Loaded {len(dense.cache)} dense and {len(sparse.cache)} sparse cached query embeddings")
+
+
+def _persist(dense: CachedEmbeddings, sparse: CachedSparseEmbeddings) -> None:
+    dense.cache.save(os.path.join(EMBEDDING_CACHE_DIR, "dense.json"))
+    sparse.cache.save(os.path.join(EMBEDDING_CACHE_DIR, "sparse.json"), encode=_encode_sparse)
+
+
+def save_embedding_caches(dense: CachedEmbeddings, sparse: CachedSparseEmbeddings) -> None:
+    """
+    Persist both query caches to `RAG_EMBEDDING_CACHE_DIR`, if configured, and log their counters.
+    """
+    logger.info(f"Dense query embedding cache: {dense.cache.stats()}")
+    logger.info(f"Sparse query embedding cache: {sparse.cache.stats()}")
+    if not EMBEDDING_CACHE_DIR:
+        return
+    _persist(dense, sparse)
+
+
+async def _persistence_loop(
+    dense: CachedEmbeddings, sparse: CachedSparseEmbeddings, saved: Tuple[int, int]
+) -> None:
+    while True:
+        await asyncio.sleep(EMBEDDING_CACHE_SAVE_INTERVAL)
+        versions = (dense.cache.version, sparse.cache.version)
+        if versions == saved:
+            continue
+        try:
+            await asyncio.to_thread(_persist, dense, sparse)
+            saved = versions
+        except Exception as e:
+            logger.warning(f"Saving the query embedding caches failed: {e}")
+
+
+def start_cache_persistence(dense: CachedEmbeddings, sparse: CachedSparseEmbeddings) -> Optional[asyncio.Task]:
+    """
+    Start saving both query caches periodically whenever they have changed.
+    Files are replaced atomically, so a crash mid-save keeps the previous copy.
+
+    Returns:
+        Optional[asyncio.Task]: The running job, or None if persistence is disabled
+    """
+    if not EMBEDDING_CACHE_DIR or EMBEDDING_CACHE_SAVE_INTERVAL <= 0:
+        return None
+    saved = (dense.cache.version, sparse.cache.version)
+    return asyncio.create_task(_persistence_loop(dense, sparse, saved))
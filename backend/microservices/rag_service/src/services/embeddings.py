@@ -0,0 +1,88 @@
+import os
+import json
+from typing import Optional
+from langchain_core.embeddings import Embeddings
+
+# Dense embedding provider: "nomic" (remote API) or "fastembed" (local ONNX model on CPU).
+# Ingestion and retrieval must be configured with the same provider and model.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "nomic")
+DEFAULT_MODELS = {
+    "nomic": "nomic-embed-text-v1.5",
+    "fastembed": "nomic-ai/nomic-embed-text-v1.5",
+}
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", DEFAULT_MODELS.get(EMBEDDING_PROVIDER))
+# Where fastembed keeps downloaded models; pre-populate it to run air-gapped
+FASTEMBED_CACHE_DIR = os.getenv("FASTEMBED_CACHE_DIR")
+
+QUERY_PREFIX = "search_query: "
+DOCUMENT_PREFIX = "search_document: "
+
+IDENTITY_FILE = "embedding.json"
+# Collections written before the identity was recorded were all built with Nomic
+LEGACY_IDENTITY = {"provider": "nomic", "model": "nomic-embed-text-v1.5"}
+
+
+class EmbeddingIdentityError(RuntimeError):
+    """Raised when a collection was built with a different embedding provider or model."""
+
+
+def embedding_identity() -> dict:
+    """Return the provider and model this service embeds with."""
+    return {"provider": EMBEDDING_PROVIDER, "model": EMBEDDING_MODEL}
+
+
+def load_dense_embeddings() -> Embeddings:
+    """
+    Create the configured dense embedding model.
+
+    Returns:
+        Embeddings: Embeddings for the configured provider and model
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    if EMBEDDING_PROVIDER == "nomic":
+        from langchain_nomic import NomicEmbeddings
+        return NomicEmbeddings(model=EMBEDDING_MODEL)
+    elif EMBEDDING_PROVIDER == "fastembed":
+        from langchain_community.embeddings import FastEmbedEmbeddings
+        return FastEmbedEmbeddings(model_name=EMBEDDING_MODEL, cache_dir=FASTEMBED_CACHE_DIR)
+    raise ValueError(f"Unknown embedding provider: {EMBEDDING_PROVIDER}")
+
+
+def read_embedding_identity(storage_path: str) -> Optional[dict]:
+    """
+    Read the provider and model a collection was built with.
+
+    Args:
+        storage_path (str): Path to the collection's storage directory
+
+    Returns:
+        Optional[dict]: The recorded identity, or the legacy identity if none was
+            recorded; None if the storage directory does not exist
+    """
+    if not os.path.isdir(storage_path):
+        return None
+    try:
+        with open(os.path.join(storage_path, IDENTITY_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return LEGACY_IDENTITY
+
+
+def check_embedding_identity(storage_path: str) -> None:
+    """
+    Refuse to query a collection built with a different embedding model.
+
+    Args:
+        storage_path (str): Path to the collection's storage directory
+
+    Raises:
+        EmbeddingIdentityError: If the collection was built with another provider or model
+    """
+    stored = read_embedding_identity(storage_path)
+    if stored is not None and stored != embedding_identity():
+        raise EmbeddingIdentityError(
+            f"Collection at {storage_path} was built with {stored['provider']}/{stored['model']}, "
+            f"but this service embeds queries with {EMBEDDING_PROVIDER}/{EMBEDDING_MODEL}"
+        )
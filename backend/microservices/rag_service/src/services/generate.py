@@ -1,22 +1,91 @@
 import os
 import logging
 from langchain_groq import ChatGroq
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from pydantic import BaseModel, Field
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import SQLChatMessageHistory
+from .history import BoundedChatMessageHistory, schedule_summary
+from .storage import history_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY")
 
+# Table SQLChatMessageHistory keeps every conversation's messages in
+MESSAGE_TABLE = "message_store"
+
 
 llm = ChatGroq(
     model="llama-3.3-70b-versatile", temperature=0, streaming=True, max_retries=5
 )
 
 
+def get_history(thread_id: str) -> SQLChatMessageHistory:
+    """
+    Return the persisted chat history for a conversation.
+
+    Args:
+        thread_id (str): Unique identifier of the conversation
+
+    Returns:
+        SQLChatMessageHistory: Async history backed by the shared SQLite database
+    """
+    return SQLChatMessageHistory(
+        session_id=thread_id,
+        connection=history_engine,
+        table_name=MESSAGE_TABLE,
+        async_mode=True
+    )
+
+
+async def has_history(thread_id: str = None) -> bool:
+    """
+    Check whether a conversation already has earlier turns.
+
+    Args:
+        thread_id (str, optional): Unique identifier of the conversation
+
+    Returns:
+        bool: True if messages were previously recorded for the conversation
+    """
+    if not thread_id:
+        return False
+    async with history_engine.connect() as connection:
+        try:
+            result = await connection.execute(
+                text(f"SELECT 1 FROM {MESSAGE_TABLE} WHERE session_id = :session_id LIMIT 1"),
+                {"session_id": thread_id},
+            )
+        except OperationalError:
+            # Nothing has been recorded yet, so the table does not exist
+            return False
+        return result.first() is not None
+
+
+async def record_turn(question: str, answer: str, thread_id: str = None):
+    """
+    Append a question and answer that were served without calling the model
+    to the conversation history, so follow-up turns still see them.
+
+    Args:
+        question (str): The user's question
+        answer (str): The answer sent to the user
+        thread_id (str, optional): Unique identifier of the conversation
+    """
+    if not thread_id:
+        return
+    history = get_history(thread_id)
+    await history.aadd_messages(
+        [HumanMessage(content=question), AIMessage(content=answer)]
+    )
+    schedule_summary(f"rag:{thread_id}", history.aget_messages)
+
+
 class ResponseFormatter(BaseModel):
     """Always use this tool to structure your response to the user."""
 
@@ -54,11 +123,8 @@ async def generate(question: str, context: str, thread_id: str = None):
     chain = prompt | llm
     chat = RunnableWithMessageHistory(
         chain,
-        lambda session_id: SQLChatMessageHistory(
-            session_id=thread_id, 
-            connection_string="sqlite+aiosqlite:///./database/history.sqlite",
-            async_mode=True
-        ),
+        # Only the rolling summary and the recent turns are sent to the model
+        lambda session_id: BoundedChatMessageHistory(get_history(thread_id), f"rag:{thread_id}"),
         input_messages_key="question",
         history_messages_key="history",
     )
@@ -70,3 +136,6 @@ async def generate(question: str, context: str, thread_id: str = None):
     ):
         if hasattr(chunk, "content") and chunk.content:
             yield chunk.content
+
+    if thread_id:
+        schedule_summary(f"rag:{thread_id}", get_history(thread_id).aget_messages)
@@ -1,22 +1,245 @@
 import os
+import time
+import asyncio
 import logging
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from langchain_cohere import CohereRerank
 from langchain_core.documents import Document
 from langchain.retrievers import contextual_compression
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from langchain_qdrant import FastEmbedSparse
-from langchain_nomic import NomicEmbeddings
+from .cache import TTLCache
+from .embeddings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_PROVIDER,
+    QUERY_PREFIX,
+    EmbeddingIdentityError,
+    check_embedding_identity,
+    load_dense_embeddings,
+)
+from .embedding_cache import CachedEmbeddings, CachedSparseEmbeddings, normalize_query
 # from .generate import generateHyde
 
 logger = logging.getLogger(__name__)
 
 os.environ["COHERE_API_KEY"] = os.getenv("COHERE_API_KEY")
-os.environ["NOMIC_API_KEY"] = os.getenv("NOMIC_API_KEY")
 
-# Initialize embeddings and retriever once
-dense_embeddings = NomicEmbeddings(model="nomic-embed-text-v1.5")
-sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+QDRANT_PATH = "./qdrant"
+COLLECTION_NAME = "qdrantdb"
+# Written by file_upload_service every time the collection is updated
+GENERATION_FILE = os.path.join(QDRANT_PATH, "GENERATION")
+# Maximum number of retrievals running at once; each one occupies a worker thread
+RETRIEVAL_CONCURRENCY = int(os.getenv("RAG_RETRIEVAL_CONCURRENCY", "4"))
+RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_TTL = float(os.getenv("RAG_RESULT_CACHE_TTL", "3600"))
+# Backoff between attempts to open a generation that failed to open
+GENERATION_RETRY_SECONDS = float(os.getenv("RAG_GENERATION_RETRY_SECONDS", "1"))
+GENERATION_RETRY_MAX_SECONDS = float(os.getenv("RAG_GENERATION_RETRY_MAX_SECONDS", "60"))
+
+# Initialize embeddings and retriever once; query vectors are cached in front of both encoders
+dense_embeddings = CachedEmbeddings(
+    load_dense_embeddings(), model_name=f"{EMBEDDING_PROVIDER}/{EMBEDDING_MODEL}"
+)
+sparse_embeddings = CachedSparseEmbeddings(
+    FastEmbedSparse(model_name="Qdrant/bm25"), model_name="Qdrant/bm25"
+)
+
+
+def read_generation() -> Optional[str]:
+    """
+    Read the collection generation id published by file_upload_service.
+
+    Returns:
+        Optional[str]: The current generation id, or None if no marker exists
+    """
+    try:
+        with open(GENERATION_FILE, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class RetrievalEngine:
+    """
+    Process-wide handle on the Qdrant collection and the reranking retriever.
+
+    The collection is opened once and kept warm across requests. Every lookup
+    checks the generation marker and, when file_upload_service has rebuilt the
+    collection, opens the new data and swaps it in without a restart.
+    """
+    def __init__(self, path: str = QDRANT_PATH, collection_name: str = COLLECTION_NAME) -> None:
+        self.path = path
+        self.collection_name = collection_name
+        self.compressor = CohereRerank(model="rerank-v3.5", top_n=5)
+        self._state = None
+        self._marker_mtime = None
+        self._lock = threading.Lock()
+        # Failed open of the marker at `_failed_mtime`: retried from `_retry_at`
+        self._failed_mtime = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._error = None
+
+
+    @property
+    def generation(self) -> Optional[str]:
+        """Generation id of the collection currently being served."""
+        return self._state[1] if self._state is not None else None
+
+
+    def _marker_mtime_ns(self) -> Optional[int]:
+        try:
+            return os.stat(GENERATION_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+
+    def _storage_path(self, generation: Optional[str]) -> str:
+        """
+        Each generation lives in its own directory under the storage folder; data
+        written before generations were versioned sits in the folder itself.
+        """
+        if generation:
+            path = os.path.join(self.path, generation)
+            if os.path.isdir(path):
+                return path
+        return self.path
+
+
+    def _open(self, generation: Optional[str]) -> contextual_compression.ContextualCompressionRetriever:
+        """
+        Open the collection and build the hybrid search + rerank retriever on top of it.
+        The collection must have been built with the embedding model used for queries.
+        """
+        storage_path = self._storage_path(generation)
+        check_embedding_identity(storage_path)
+        vectordb = QdrantVectorStore.from_existing_collection(
+            embedding=dense_embeddings,
+            sparse_embedding=sparse_embeddings,
+            collection_name=self.collection_name,
+            path=storage_path,
+            retrieval_mode=RetrievalMode.HYBRID,
+        )
+        retriever = vectordb.as_retriever(search_kwargs={"k": 10})
+        return contextual_compression.ContextualCompressionRetriever(
+            base_compressor=self.compressor, base_retriever=retriever
+        )
+
+
+    def _served_path_missing(self) -> bool:
+        """True if the generation directory being served has been removed."""
+        generation = self.generation
+        return bool(generation) and not os.path.isdir(os.path.join(self.path, generation))
+
+
+    def _pending_failure(self, mtime: Optional[int]) -> bool:
+        """True while a failed open of this marker is waiting for its next retry."""
+        return mtime == self._failed_mtime and time.monotonic() < self._retry_at
+
+
+    def _serve_after_failure(self) -> Tuple[contextual_compression.ContextualCompressionRetriever, Optional[str]]:
+        """
+        Keep serving the previous generation while a failed open waits for its retry,
+        unless the new generation was refused for its embedding model or the previous
+        generation has been pruned in the meantime.
+        """
+        if isinstance(self._error, EmbeddingIdentityError):
+            raise self._error
+        if self._served_path_missing():
+            raise RuntimeError(
+                f"Generation {self.generation} has been removed and "
+                f"generation {read_generation()} could not be opened: {self._error}"
+            )
+        return self._state
+
+
+    def current(self) -> Tuple[contextual_compression.ContextualCompressionRetriever, Optional[str]]:
+        """
+        Return the warm retriever, reloading it first if the collection generation changed.
+
+        While an update is being written the marker still names the previous generation,
+        or is absent for a legacy rebuild, and the current handle keeps serving. A new
+        generation is opened by a single request; concurrent requests keep using the
+        previous retriever until the swap. Requests already holding the old retriever
+        finish against it; it is released once the last reference goes away, and
+        file_upload_service only removes superseded generations after a grace period.
+
+        If the new generation cannot be opened the previous one stays in service and the
+        open is retried with exponential backoff. A generation built with another
+        embedding model is refused: the error is raised rather than answering from the
+        previous collection.
+
+        Returns:
+            Tuple[ContextualCompressionRetriever, Optional[str]]: Retriever bound to the
+                latest collection and the generation id it was opened at
+
+        Raises:
+            EmbeddingIdentityError: If the published collection was built with another
+                embedding provider or model
+        """
+        mtime = self._marker_mtime_ns()
+        state = self._state
+        if state is not None and (mtime is None or mtime == self._marker_mtime):
+            return state
+        if state is not None and self._pending_failure(mtime):
+            return self._serve_after_failure()
+
+        if state is None:
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            # Another request is opening the new generation
+            return state
+        try:
+            mtime = self._marker_mtime_ns()
+            if self._state is not None and (mtime is None or mtime == self._marker_mtime):
+                return self._state
+            if self._pending_failure(mtime):
+                if self._state is None:
+                    raise self._error
+                return self._serve_after_failure()
+
+            generation = read_generation()
+            if self._state is None or generation != self._state[1]:
+                logger.info(f"Opening collection '{self.collection_name}' (generation {generation})")
+                try:
+                    self._state = (self._open(generation), generation)
+                except Exception as e:
+                    self._record_failure(mtime, e)
+                    if self._state is None or isinstance(e, EmbeddingIdentityError):
+                        raise
+                    logger.error(
+                        f"Could not open generation {generation}, still serving generation "
+                        f"{self._state[1]}; retrying in {self._retry_at - time.monotonic():.0f}s: {e}"
+                    )
+                    return self._serve_after_failure()
+            self._marker_mtime = mtime
+            self._failed_mtime = None
+            self._failures = 0
+            self._error = None
+            return self._state
+        finally:
+            self._lock.release()
+
+
+    def _record_failure(self, mtime: Optional[int], error: Exception) -> None:
+        """Schedule the next attempt to open the generation behind this marker."""
+        if mtime != self._failed_mtime:
+            self._failures = 0
+        self._failed_mtime = mtime
+        self._failures += 1
+        self._error = error
+        delay = min(GENERATION_RETRY_SECONDS * 2 ** (self._failures - 1), GENERATION_RETRY_MAX_SECONDS)
+        self._retry_at = time.monotonic() + delay
+
+
+engine = RetrievalEngine()
+# Reranked results keyed by (generation, normalized question)
+result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_CONCURRENCY, thread_name_prefix="retrieval"
+)
 
 
 def repack_documents(documents: List[Document]) -> List[Document]:
@@ -40,7 +263,7 @@ def repack_documents(documents: List[Document]) -> List[Document]:
         raise ValueError(f"Error sorting documents: {e}")
 
 
-def retrieve_documents(question: str) -> List[Document]:
+def retrieve_documents(question: str) -> Tuple[List[Document], float, Optional[str]]:
     """
     This function implements a multi-stage retrieval process:
     1. Generates a hypothetical answer using HyDE
@@ -49,27 +272,28 @@ def retrieve_documents(question: str) -> List[Document]:
     4. Filters documents by relevance score threshold
     5. Sorts final results by relevance
 
+    Results are cached per collection generation, so a re-ingest invalidates
+    every entry computed against the previous data.
+
     Args:
         question (str): The user's question to find relevant documents for
 
     Returns:
-        List[Document]: List of relevant documents sorted by relevance score
+        Tuple[List[Document], float, Optional[str]]: Relevant documents sorted by
+            relevance score, the highest relevance score, and the collection
+            generation they were retrieved from
     """
-    vectordb = QdrantVectorStore.from_existing_collection(
-        embedding=dense_embeddings,
-        sparse_embedding=sparse_embeddings,
-        collection_name="qdrantdb",
-        path="./qdrant",
-        retrieval_mode=RetrievalMode.HYBRID,
-    )
-    retriever = vectordb.as_retriever(search_kwargs={"k": 10})
-
-    compressor = CohereRerank(model="rerank-v3.5", top_n=5)
-    c_retriever = contextual_compression.ContextualCompressionRetriever(
-        base_compressor=compressor, base_retriever=retriever
-    )
+    # Keyed like the query embedding cache, on the exact text that is searched
+    question = normalize_query(question)
+    c_retriever, generation = engine.current()
+    cache_key = (generation, question) if generation else None
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            docs, max_relevance = cached
+            return list(docs), max_relevance, generation
 
-    prefixed_question = f"search_query: {question}"
+    prefixed_question = f"{QUERY_PREFIX}{question}"
     reranked_docs = c_retriever.invoke(prefixed_question)
     max_relevance = 0
     filtered_docs = []
@@ -77,4 +301,43 @@ def retrieve_documents(question: str) -> List[Document]:
         max_relevance = max(max_relevance, doc.metadata["relevance_score"])
         if doc.metadata["relevance_score"] > 0.5:
             filtered_docs.append(doc)
-    return repack_documents(filtered_docs), max_relevance
+    docs = repack_documents(filtered_docs)
+    if cache_key is not None:
+        result_cache.set(cache_key, (docs, max_relevance))
+    return list(docs), max_relevance, generation
+
+
+async def aretrieve_documents(question: str) -> Tuple[List[Document], float, Optional[str]]:
+    """
+    Run `retrieve_documents` without blocking the event loop.
+
+    Dense embedding, BM25 encoding, the Qdrant search and the Cohere rerank are
+    all blocking calls, so the whole pipeline is offloaded to a bounded thread
+    pool. At most `RAG_RETRIEVAL_CONCURRENCY` retrievals run at once; the rest
+    wait without holding up other streams served by the same worker.
+
+    Args:
+        question (str): The user's question to find relevant documents for
+
+    Returns:
+        Tuple[List[Document], float, Optional[str]]: Relevant documents, the highest
+            relevance score and the collection generation, as `retrieve_documents`
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, retrieve_documents, question)
+
+
+async def aembed_question(question: str) -> List[float]:
+    """
+    Embed the question exactly as retrieval does, reusing the query embedding cache.
+
+    Args:
+        question (str): The user's question
+
+    Returns:
+        List[float]: Dense embedding of the prefixed question
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        retrieval_executor, dense_embeddings.embed_query, f"{QUERY_PREFIX}{question}"
+    )
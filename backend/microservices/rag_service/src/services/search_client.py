@@ -0,0 +1,76 @@
+import os
+import json
+import logging
+from typing import AsyncIterator, Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SERVICE_URL = os.getenv("SEARCH_SERVICE_URL", "http://search-service:8000/v1/search")
+# Connection pool shared by all requests to other services
+HTTP_POOL_LIMIT = int(os.getenv("RAG_HTTP_POOL_LIMIT", "32"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("RAG_HTTP_CONNECT_TIMEOUT", "5"))
+# Maximum silence between two chunks of a streamed response
+HTTP_READ_TIMEOUT = float(os.getenv("RAG_HTTP_READ_TIMEOUT", "60"))
+
+
+class HttpClient:
+    """
+    Process-wide aiohttp session with keep-alive connections, opened in the
+    application lifespan and reused by every request.
+    """
+    def __init__(self) -> None:
+        self._session: Optional[aiohttp.ClientSession] = None
+
+
+    async def start(self) -> None:
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(
+            total=None, connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Raises:
+            RuntimeError: If the client has not been started
+        """
+        if self._session is None:
+            raise RuntimeError("HTTP client has not been started")
+        return self._session
+
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+http_client = HttpClient()
+
+
+async def stream_search(question: str, chat_id: str = None) -> AsyncIterator[dict]:
+    """
+    Ask the search service and yield its Server-Sent Events as they arrive.
+
+    Args:
+        question (str): The user's question
+        chat_id (str, optional): Unique identifier of the conversation
+
+    Yields:
+        dict: Decoded event payloads, e.g. {'content': ...} or {'citations': [...]}
+    """
+    async with http_client.session.post(
+        SEARCH_SERVICE_URL,
+        json={"question": question, "chatId": chat_id},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            line = line.decode("utf-8").strip()
+            if line.startswith("data: "):
+                try:
+                    yield json.loads(line[6:])  # Remove 'data: ' prefix
+                except json.JSONDecodeError:
+                    logger.warning(f"Failed to parse SSE data: {line}")
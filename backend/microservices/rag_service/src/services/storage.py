@@ -0,0 +1,54 @@
+import os
+import aiosqlite
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Shared by the rag, search and stocks services
+HISTORY_DB = "./database/history.sqlite"
+# Milliseconds a connection waits for another service's write lock before failing
+BUSY_TIMEOUT_MS = int(os.getenv("HISTORY_BUSY_TIMEOUT_MS", "5000"))
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+)
+# Time of the latest turn of every conversation in any service; retention is keyed on it
+ACTIVITY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS conversation_activity ("
+    "chat_id TEXT PRIMARY KEY, last_active REAL NOT NULL)"
+)
+
+os.makedirs(os.path.dirname(HISTORY_DB), exist_ok=True)
+
+# One engine, and so one connection pool, for every chat history instead of one per request
+history_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{HISTORY_DB}", connect_args={"timeout": BUSY_TIMEOUT_MS / 1000}
+)
+
+
+@event.listens_for(history_engine.sync_engine, "connect")
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+async def connect(path: str = HISTORY_DB) -> aiosqlite.Connection:
+    """
+    Open a connection to the history database tuned for concurrent writers.
+
+    WAL lets readers proceed while another service writes, the busy timeout
+    makes writers queue for the lock instead of failing, and synchronous=NORMAL
+    drops the fsync on every commit, which is safe in WAL mode.
+
+    Args:
+        path (str): Path to the SQLite file
+
+    Returns:
+        aiosqlite.Connection: The open connection
+    """
+    connection = await aiosqlite.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    for pragma in PRAGMAS:
+        await connection.execute(pragma)
+    return connection
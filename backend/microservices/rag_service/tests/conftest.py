@@ -0,0 +1,33 @@
+import importlib
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+class FakeSparse:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture(scope="session")
+def retriever():
+    # Importing the retriever builds the Nomic and BM25 encoders, which need
+    # network access; tests replace whatever they call
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("COHERE_API_KEY", "test")
+        patch.setattr("langchain_qdrant.FastEmbedSparse", FakeSparse)
+        patch.setattr("src.services.embeddings.load_dense_embeddings", FakeEmbeddings)
+        module = importlib.import_module("src.services.retriever")
+    yield module
+
+
+@pytest.fixture(scope="session")
+def controller(retriever):
+    return importlib.import_module("src.controller")
@@ -0,0 +1,67 @@
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy.ext.asyncio import create_async_engine
+from src.services import generate
+from src.services.answer_cache import ANSWERS_PER_CONTEXT, SemanticAnswerCache
+
+
+def test_similar_question_over_same_context_hits():
+    cache = SemanticAnswerCache(enabled=True, threshold=0.95)
+    assert cache.lookup([1.0, 0.0], "g1", "ctx") is None
+    cache.store([1.0, 0.0], "g1", "ctx", "answer", ["a.pdf"])
+
+    assert cache.lookup([2.0, 0.1], "g1", "ctx") == ("answer", ["a.pdf"])
+    # Too far from the stored question, or another context
+    assert cache.lookup([1.0, 1.0], "g1", "ctx") is None
+    assert cache.lookup([1.0, 0.0], "g1", "other") is None
+
+
+def test_new_generation_clears_the_cache():
+    cache = SemanticAnswerCache(enabled=True)
+    cache.lookup([1.0, 0.0], "g1", "ctx")
+    cache.store([1.0, 0.0], "g1", "ctx", "answer", [])
+
+    assert cache.lookup([1.0, 0.0], "g2", "ctx") is None
+    assert cache.lookup([1.0, 0.0], "g1", "ctx") is None
+
+
+def test_answer_from_superseded_generation_is_dropped():
+    cache = SemanticAnswerCache(enabled=True)
+    cache.lookup([1.0, 0.0], "g1", "ctx")
+    # Another request has looked up against the swapped-in generation meanwhile
+    cache.lookup([1.0, 0.0], "g2", "ctx")
+    cache.store([1.0, 0.0], "g1", "ctx", "stale answer", [])
+
+    assert cache.lookup([1.0, 0.0], "g2", "ctx") is None
+
+
+def test_empty_answers_are_not_stored_and_groups_are_bounded():
+    cache = SemanticAnswerCache(enabled=True)
+    cache.lookup([1.0, 0.0], "g1", "ctx")
+    cache.store([1.0, 0.0], "g1", "ctx", "", [])
+    assert cache.lookup([1.0, 0.0], "g1", "ctx") is None
+
+    for i in range(ANSWERS_PER_CONTEXT + 1):
+        cache.store([1.0, float(i)], "g1", "ctx", f"answer {i}", [])
+    # The oldest question fell out of the group
+    assert cache.lookup([1.0, 0.0], "g1", "ctx") is None
+    assert cache.lookup([1.0, float(ANSWERS_PER_CONTEXT)], "g1", "ctx")[0] == f"answer {ANSWERS_PER_CONTEXT}"
+
+
+def test_has_history(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.sqlite'}")
+    monkeypatch.setattr(generate, "history_engine", engine)
+
+    async def run():
+        try:
+            # The message table does not exist yet
+            assert not await generate.has_history("c1")
+            await generate.get_history("c1").aadd_messages(
+                [HumanMessage(content="q"), AIMessage(content="a")]
+            )
+            return await generate.has_history("c1"), await generate.has_history("c2")
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == (True, False)
+    assert not asyncio.run(generate.has_history(None))
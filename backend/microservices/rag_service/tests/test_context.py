@@ -0,0 +1,68 @@
+import pytest
+from langchain_core.documents import Document
+from src.services import context
+from src.services.embeddings import DOCUMENT_PREFIX
+
+
+class CharEncoding:
+    """One token per character, so budgets are exact."""
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+@pytest.fixture
+def chars(monkeypatch):
+    monkeypatch.setattr(context, "_encoding", CharEncoding())
+
+
+def doc(text, score):
+    return Document(page_content=f"{DOCUMENT_PREFIX}{text}", metadata={"relevance_score": score})
+
+
+def test_near_duplicates_are_dropped(chars):
+    original = " ".join(f"word{i}" for i in range(40))
+    near_copy = original.replace("word39", "changed")
+    other = " ".join(f"other{i}" for i in range(40))
+
+    text, selected, _ = context.assemble_context(
+        [doc(original, 0.9), doc(near_copy, 0.8), doc(other, 0.7)], budget=10_000
+    )
+
+    # The best of the duplicates is kept, and relevance ascends towards the question
+    assert [d.metadata["relevance_score"] for d in selected] == [0.7, 0.9]
+    assert text == f"{other}\n{original}"
+
+
+def test_chunks_that_do_not_fit_are_skipped(chars):
+    docs = [doc("a" * 50, 0.9), doc("b " * 25, 0.8), doc("c" * 30, 0.7)]
+
+    text, selected, used = context.assemble_context(docs, budget=90)
+
+    # 51 tokens for the first chunk; the second would reach 102, the third fits
+    assert used == 82 <= 90
+    assert [d.metadata["relevance_score"] for d in selected] == [0.7, 0.9]
+    assert text == "c" * 30 + "\n" + "a" * 50
+
+
+def test_oversized_top_chunk_is_truncated_to_the_budget(chars):
+    text, selected, used = context.assemble_context([doc("x" * 200, 0.9)], budget=50)
+
+    assert text == "x" * 49
+    assert used == 50
+    assert len(selected) == 1
+
+
+def test_truncation_boundary(chars):
+    assert context.truncate_to_tokens("abcdefghij", 10) == ("abcdefghij", 10)
+    assert context.truncate_to_tokens("abcdefghij", 9) == ("abcdefghi", 9)
+    assert context.truncate_to_tokens("abcdefghij", 0) == ("", 0)
+
+
+def test_truncation_estimate_without_encoding(monkeypatch):
+    monkeypatch.setattr(context, "_encoding", False)
+
+    assert context.truncate_to_tokens("x" * 41, 10) == ("x" * 40, 10)
+    assert context.count_tokens("x" * 41) == 11
@@ -0,0 +1,71 @@
+import asyncio
+import orjson
+from langchain_core.documents import Document
+from src.entities import ChatRequest
+from src.services.answer_cache import SemanticAnswerCache, fingerprint
+
+
+async def collect(response):
+    frames = b"".join([frame async for frame in response.body_iterator])
+    return [orjson.loads(line[len(b"data: "):]) for line in frames.split(b"\n\n") if line.startswith(b"data: ")]
+
+
+def test_web_search_error_reaches_the_client(controller, monkeypatch):
+    recorded = []
+
+    async def no_documents(question):
+        return [], 0.0, None
+
+    async def failing_search(question, chat_id):
+        yield {"content": "Partial "}
+        yield {"error": "Tavily is unavailable"}
+
+    async def record_turn(question, answer, chat_id):
+        recorded.append(answer)
+
+    monkeypatch.setattr(controller, "aretrieve_documents", no_documents)
+    monkeypatch.setattr(controller, "stream_search", failing_search)
+    monkeypatch.setattr(controller, "record_turn", record_turn)
+
+    async def run():
+        return await collect(await controller.rag_stream(ChatRequest(question="q", chatId="c")))
+
+    events = asyncio.run(run())
+
+    assert events[-1] == {"error": "Web search failed: Tavily is unavailable"}
+    assert recorded == []
+
+
+def test_answer_is_cached_under_the_generation_it_was_built_from(controller, retriever, monkeypatch):
+    cache = SemanticAnswerCache(enabled=True)
+    docs = [Document(page_content="Paris is the capital.", metadata={"source": "a.pdf", "page": 0, "relevance_score": 0.9})]
+
+    async def retrieve(question):
+        # The engine swaps to g2 once retrieval from g1 has finished
+        retriever.engine._state = (None, "g2")
+        return docs, 0.9, "g1"
+
+    async def embed(question):
+        return [1.0, 0.0]
+
+    async def no_history(chat_id):
+        return False
+
+    async def generate(question, context, chat_id):
+        yield "Paris"
+
+    monkeypatch.setattr(retriever.engine, "_state", None)
+    monkeypatch.setattr(controller, "aretrieve_documents", retrieve)
+    monkeypatch.setattr(controller, "aembed_question", embed)
+    monkeypatch.setattr(controller, "has_history", no_history)
+    monkeypatch.setattr(controller, "generate", generate)
+    monkeypatch.setattr(controller, "answer_cache", cache)
+
+    async def run():
+        return await collect(await controller.rag_stream(ChatRequest(question="q", chatId="c")))
+
+    events = asyncio.run(run())
+
+    assert events[0] == {"content": "Paris"}
+    context = "Paris is the capital."
+    assert cache.lookup([1.0, 0.0], "g1", fingerprint(context)) == ("Paris", [{"title": "a.pdf", "citation": "0"}])
@@ -0,0 +1,47 @@
+import asyncio
+import os
+from langchain_core.embeddings import Embeddings
+from src.services import embedding_cache
+from src.services.embedding_cache import CachedEmbeddings, CachedSparseEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [float(len(self.embedded))]
+
+
+def test_cache_key_and_embedded_text_match():
+    base = RecordingEmbeddings()
+    dense = CachedEmbeddings(base, model_name="test")
+
+    first = dense.embed_query("What  is\nRAG? ")
+    assert dense.embed_query("What is RAG?") == first
+    assert dense.embed_query("what is rag?") != first
+    assert base.embedded == ["What is RAG?", "what is rag?"]
+
+
+def test_caches_are_saved_periodically(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_SAVE_INTERVAL", 0.01)
+    dense = CachedEmbeddings(RecordingEmbeddings(), model_name="test")
+    sparse = CachedSparseEmbeddings(RecordingEmbeddings(), model_name="test")
+
+    async def run():
+        task = embedding_cache.start_cache_persistence(dense, sparse)
+        dense.embed_query("question")
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert os.path.exists(tmp_path / "dense.json")
+
+    restored = CachedEmbeddings(RecordingEmbeddings(), model_name="test")
+    restored.cache.load(str(tmp_path / "dense.json"))
+    assert len(restored.cache) == 1
@@ -0,0 +1,36 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from src.services.history import bounded_messages, window_start
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    return messages
+
+
+def test_window_waits_for_a_lagging_summary():
+    messages = conversation(10)
+    start = window_start(messages, max_turns=6)
+    assert start == 8
+
+    # The summary only covers the first two turns, so turns 2 and 3 stay verbatim
+    bounded = bounded_messages(messages, "summary", 4)
+    assert isinstance(bounded[0], SystemMessage)
+    assert bounded[1:] == messages[4:]
+
+
+def test_window_without_a_summary_keeps_everything():
+    messages = conversation(10)
+    assert bounded_messages(messages, "", 0) == messages
+
+
+def test_caught_up_summary_bounds_the_window():
+    messages = conversation(10)
+    start = window_start(messages)
+    assert bounded_messages(messages, "summary", start)[1:] == messages[start:]
+
+
+def test_summary_of_a_replaced_conversation_is_ignored():
+    messages = conversation(2)
+    assert bounded_messages(messages, "stale", 40) == messages
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+# Seconds one blocking retrieval takes in these tests
+RETRIEVAL_SECONDS = 0.3
+
+
+def test_streams_keep_flowing_during_retrieval(retriever, monkeypatch):
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def blocking_retrieve(question):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(RETRIEVAL_SECONDS)
+        with lock:
+            running -= 1
+        return [], 0, None
+
+    monkeypatch.setattr(retriever, "retrieve_documents", blocking_retrieve)
+
+    async def stream(ticks):
+        # Stands in for another SSE stream served by the same event loop
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        ticks = []
+        ticker = asyncio.create_task(stream(ticks))
+        started = time.monotonic()
+        await asyncio.gather(*(retriever.aretrieve_documents(f"q{i}") for i in range(2)))
+        elapsed = time.monotonic() - started
+        ticker.cancel()
+        return ticks, elapsed
+
+    ticks, elapsed = asyncio.run(run())
+
+    # Both retrievals ran side by side in the pool...
+    assert peak == 2
+    assert elapsed < 2 * RETRIEVAL_SECONDS
+    # ...while the loop kept serving the other stream without long stalls
+    assert len(ticks) >= 10
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < RETRIEVAL_SECONDS / 2
+
+
+def test_retrievals_are_bounded_by_the_pool(retriever, monkeypatch):
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def blocking_retrieve(question):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return [], 0, None
+
+    monkeypatch.setattr(retriever, "retrieve_documents", blocking_retrieve)
+    requests = retriever.RETRIEVAL_CONCURRENCY * 3
+
+    async def run():
+        return await asyncio.gather(*(retriever.aretrieve_documents(f"q{i}") for i in range(requests)))
+
+    results = asyncio.run(run())
+
+    assert len(results) == requests
+    assert peak == retriever.RETRIEVAL_CONCURRENCY
@@ -0,0 +1,127 @@
+import os
+import pytest
+from langchain_core.documents import Document
+
+
+class StubRetriever:
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        return [Document(page_content="chunk", metadata={"relevance_score": 0.9})]
+
+
+class StubEngine:
+    def __init__(self, generation):
+        self.retriever = StubRetriever()
+        self.generation = generation
+
+    def current(self):
+        return self.retriever, self.generation
+
+
+def test_result_cache_keys_on_the_searched_text(retriever, monkeypatch):
+    engine = StubEngine("g1")
+    monkeypatch.setattr(retriever, "engine", engine)
+    monkeypatch.setattr(retriever, "result_cache", retriever.TTLCache())
+
+    retriever.retrieve_documents("What is  RAG?")
+    retriever.retrieve_documents(" What is RAG? ")
+    # Case changes the query embedding, so it is a different search
+    retriever.retrieve_documents("what is rag?")
+
+    assert engine.retriever.queries == [
+        f"{retriever.QUERY_PREFIX}What is RAG?",
+        f"{retriever.QUERY_PREFIX}what is rag?",
+    ]
+
+
+class Store:
+    """Stands in for the Qdrant generations file_upload_service publishes."""
+    def __init__(self, path):
+        self.path = path
+        self.mtime = 0
+        self.now = 100.0
+        self.failures = {}
+        self.opened = []
+
+    def publish(self, generation):
+        os.makedirs(os.path.join(self.path, generation), exist_ok=True)
+        marker = os.path.join(self.path, "GENERATION")
+        with open(marker, "w") as f:
+            f.write(generation)
+        self.mtime += 1_000_000_000
+        os.utime(marker, ns=(self.mtime, self.mtime))
+
+    def open(self, generation):
+        self.opened.append(generation)
+        errors = self.failures.get(generation)
+        if errors:
+            raise errors.pop(0)
+        return f"retriever@{generation}"
+
+
+@pytest.fixture
+def store(retriever, tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever.time, "monotonic", lambda: store.now)
+    monkeypatch.setattr(retriever, "GENERATION_FILE", str(tmp_path / "GENERATION"))
+    monkeypatch.setattr(retriever, "CohereRerank", lambda **kwargs: None)
+    monkeypatch.setattr(retriever, "GENERATION_RETRY_SECONDS", 1)
+    monkeypatch.setattr(retriever, "GENERATION_RETRY_MAX_SECONDS", 4)
+    store = Store(str(tmp_path))
+    store.engine = retriever.RetrievalEngine(path=str(tmp_path))
+    monkeypatch.setattr(store.engine, "_open", store.open)
+    return store
+
+
+def test_new_generation_is_swapped_in(store):
+    store.publish("g1")
+    assert store.engine.current() == ("retriever@g1", "g1")
+    assert store.engine.current() == ("retriever@g1", "g1")
+
+    store.publish("g2")
+    assert store.engine.current() == ("retriever@g2", "g2")
+    assert store.opened == ["g1", "g2"]
+
+
+def test_failed_open_is_retried_with_backoff(store):
+    store.publish("g1")
+    store.engine.current()
+    store.failures["g2"] = [OSError("storage locked"), OSError("storage locked")]
+    store.publish("g2")
+
+    # The previous generation keeps serving between attempts, 1s then 2s apart
+    for elapsed, opens in [(0, 1), (0.5, 1), (1, 2), (2.5, 2), (3, 3)]:
+        store.now = 100.0 + elapsed
+        served = "g2" if opens == 3 else "g1"
+        assert store.engine.current() == (f"retriever@{served}", served)
+        assert store.opened.count("g2") == opens
+
+
+def test_failed_first_open_raises(store):
+    store.failures["g1"] = [OSError("storage locked")]
+    store.publish("g1")
+
+    with pytest.raises(OSError):
+        store.engine.current()
+    with pytest.raises(OSError):
+        store.engine.current()
+    assert store.opened == ["g1"]
+
+    store.now += 1
+    assert store.engine.current() == ("retriever@g1", "g1")
+
+
+def test_generation_from_another_embedding_model_is_refused(retriever, store):
+    store.publish("g1")
+    store.engine.current()
+    store.failures["g2"] = [retriever.EmbeddingIdentityError("built with another model")]
+    store.publish("g2")
+
+    # Raised instead of answering from the previous collection, also while awaiting the retry
+    with pytest.raises(retriever.EmbeddingIdentityError):
+        store.engine.current()
+    with pytest.raises(retriever.EmbeddingIdentityError):
+        store.engine.current()
+    assert store.opened == ["g1", "g2"]
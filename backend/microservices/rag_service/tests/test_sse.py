@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import orjson
+import pytest
+from src.services import sse
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+async def collect(events):
+    return [frame async for frame in sse.sse_stream(events)]
+
+
+def payloads(frames):
+    return [orjson.loads(frame[len(b"data: "):]) for frame in frames if frame.startswith(b"data: ")]
+
+
+async def tokens(count, delay=0.0):
+    for i in range(count):
+        if delay:
+            await asyncio.sleep(delay)
+        yield {"content": f"t{i} "}
+    yield {"citations": ["a"]}
+
+
+def test_content_is_coalesced_and_order_kept():
+    frames = asyncio.run(collect(tokens(100)))
+    events = payloads(frames)
+    assert len(frames) < 100
+    assert "".join(e["content"] for e in events[:-1]) == "".join(f"t{i} " for i in range(100))
+    assert events[-1] == {"citations": ["a"]}
+
+
+def test_source_keeps_task_bound_state_across_yields(monkeypatch):
+    # Flush timer fires while the source is suspended inside its own timeout and contextvar token
+    monkeypatch.setattr(sse, "SSE_COALESCE_MS", 1)
+
+    async def source():
+        async with asyncio.timeout(10):
+            token = request_id.set("abc")
+            for i in range(5):
+                await asyncio.sleep(0.005)
+                yield {"content": request_id.get()}
+            request_id.reset(token)
+
+    events = payloads(asyncio.run(collect(source())))
+    assert "".join(e["content"] for e in events) == "abc" * 5
+
+
+def test_source_errors_are_raised_after_buffered_content():
+    async def source():
+        yield {"content": "partial"}
+        raise ValueError("boom")
+
+    frames = []
+
+    async def run():
+        async for frame in sse.sse_stream(source()):
+            frames.append(frame)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert payloads(frames) == [{"content": "partial"}]
+
+
+def test_closing_the_stream_closes_the_source():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            while True:
+                yield {"citations": []}
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    async def run():
+        stream = sse.sse_stream(source())
+        await anext(stream)
+        await stream.aclose()
+        return closed.is_set()
+
+    assert asyncio.run(run())
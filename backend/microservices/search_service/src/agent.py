@@ -1,11 +1,12 @@
 import os
 import logging
-import aiosqlite
 from langchain_groq import ChatGroq
 from langchain_tavily import TavilySearch
 from langgraph.prebuilt import create_react_agent
 # from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from .history import history_hook, schedule_summary
+from .storage import connect
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,10 +20,63 @@ llm = ChatGroq(
     streaming=True
 )
 
+SYSTEM_PROMPT = "You are a helpful assistant. Respond concisely and only answer the specific question asked."
+
+
+class SearchAgent:
+    """
+    Search agent compiled once at startup and shared by every request.
+
+    Conversation history is checkpointed through a single connection to the
+    history database: SQLite admits one writer at a time, so more connections
+    would add contention without any write parallelism.
+    """
+    def __init__(self) -> None:
+        self._connection = None
+        self._agent = None
+
+
+    async def start(self) -> None:
+        """Open the history connection and compile the agent."""
+        self._connection = await connect()
+        checkpointer = AsyncSqliteSaver(self._connection)
+        await checkpointer.setup()
+        self._agent = create_react_agent(
+            model=llm,
+            tools=[TavilySearch(max_results=5, topic="general")],
+            prompt=SYSTEM_PROMPT,
+            checkpointer=checkpointer,
+            pre_model_hook=history_hook("search")
+        )
+        logger.info("Compiled the search agent")
+
+
+    def get(self):
+        """
+        Return the compiled agent.
+
+        Raises:
+            RuntimeError: If the agent has not been started
+        """
+        if self._agent is None:
+            raise RuntimeError("Search agent has not been started")
+        return self._agent
+
+
+    async def close(self) -> None:
+        """Close the history connection."""
+        self._agent = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+search_agent = SearchAgent()
+
 
 async def agent(question: str, thread_id: str = None):
     """
-    Create and execute a streaming agent for web search and response generation.
+    Execute the streaming agent for web search and response generation.
     
     Args:
         question (str): The user's question to search for and answer
@@ -33,16 +87,7 @@ async def agent(question: str, thread_id: str = None):
             - content (str): Response content or tool result
             - is_tool_call (bool): True if the chunk is from a tool call, False if it's content
     """
-    connection = await aiosqlite.connect("./database/history.sqlite", check_same_thread=False)
-    checkpointer = AsyncSqliteSaver(connection)
-
-    search_tool = TavilySearch(max_results=5, topic="general")
-    agent = create_react_agent(
-            model=llm, 
-            tools=[search_tool],
-            prompt="You are a helpful assistant. Respond concisely and only answer the specific question asked.",
-            checkpointer=checkpointer
-        )
+    agent = search_agent.get()
     config = {"configurable": {"thread_id": thread_id}} if thread_id else {}
     logger.info(f"Conversation thread ID: {thread_id}")
     
@@ -54,5 +99,11 @@ async def agent(question: str, thread_id: str = None):
         message = chunk[0]
         yield (message.content, True if hasattr(message, "tool_call_id") else False)
 
-            
-                
\ No newline at end of file
+    if thread_id:
+        schedule_summary(f"search:{thread_id}", lambda: load_messages(agent, config))
+
+
+async def load_messages(agent, config: dict) -> list:
+    """Return every checkpointed message of a conversation."""
+    state = await agent.aget_state(config)
+    return state.values.get("messages", [])
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
 from .agent import agent
+from .sse import sse_response
 from pydantic import BaseModel
 import json
 
@@ -42,15 +42,7 @@ async def search(request: ChatRequest):
                     for result in chunk_dict["results"][:3]:
                         urls.append({"title": result["title"], "citation": result["url"]})
             if chunk and isTool is False:
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
+                yield {'content': chunk}
         if urls:
-            yield f"data: {json.dumps({'citations': urls})}\n\n"
-    return StreamingResponse(
-        generate_response(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/event-stream",
-        }
-    )
\ No newline at end of file
+            yield {'citations': urls}
+    return sse_response(generate_response())
\ No newline at end of file
@@ -1,9 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .controller import router as search_router
+from .agent import search_agent
+from .storage import start_maintenance
+from . import history
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await search_agent.start()
+    maintenance = start_maintenance()
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+    await history.close()
+    await search_agent.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+import contextlib
+from typing import AsyncIterator
+import orjson
+from fastapi.responses import StreamingResponse
+
+# Content chunks are merged into one frame until this many milliseconds have passed
+# since the first buffered chunk or this many bytes are buffered; 0 sends every chunk
+# as its own frame as soon as it arrives
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "25"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "2048"))
+# Seconds without any frame after which a comment line keeps proxies from closing the stream; 0 disables
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+HEARTBEAT = b": keep-alive\n\n"
+# Payloads read ahead of the client; bounds memory when the client is slow
+SSE_QUEUE_SIZE = 64
+_END = object()
+
+
+class _SourceFailed:
+    """Carries an exception raised by the source out of the reading task."""
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def encode_event(payload: dict) -> bytes:
+    """Encode a payload as one Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+async def _read_events(events: AsyncIterator[dict], queue: asyncio.Queue) -> None:
+    """
+    Drive the source to completion from a single task, handing payloads over a queue.
+    Cancel scopes, timeouts and context variables the source holds across its
+    yields therefore stay bound to one task for its whole lifetime.
+    """
+    iterator = events.__aiter__()
+    try:
+        async for event in iterator:
+            await queue.put(event)
+        await queue.put(_END)
+    except Exception as e:
+        await queue.put(_SourceFailed(e))
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+async def sse_stream(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """
+    Turn event payloads into Server-Sent Events frames.
+
+    Payloads holding only 'content' are coalesced into larger frames by time
+    and size; any other payload flushes the buffered content first, so frame
+    order is preserved. Idle streams get heartbeat comments, which SSE clients
+    ignore. The source is iterated by one reader task and handed over through a
+    bounded queue, so waiting for the flush timer never interrupts it.
+
+    Args:
+        events (AsyncIterator[dict]): Payloads such as {'content': ...} or {'citations': [...]}
+
+    Yields:
+        bytes: Encoded frames
+    """
+    window = SSE_COALESCE_MS / 1000
+    buffer, buffered_bytes, flush_at = [], 0, None
+    last_sent = time.monotonic()
+    queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    reader = asyncio.create_task(_read_events(events, queue))
+
+    def flush() -> bytes:
+        nonlocal buffer, buffered_bytes, flush_at
+        frame = encode_event({"content": "".join(buffer)})
+        buffer, buffered_bytes, flush_at = [], 0, None
+        return frame
+
+    try:
+        while True:
+            deadlines = []
+            if flush_at is not None:
+                deadlines.append(flush_at)
+            if SSE_HEARTBEAT_SECONDS > 0:
+                deadlines.append(last_sent + SSE_HEARTBEAT_SECONDS)
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            try:
+                if not queue.empty():
+                    event = queue.get_nowait()
+                else:
+                    # Cancelling a queue read on timeout never loses a payload
+                    event = await asyncio.wait_for(queue.get(), timeout)
+            except TimeoutError:
+                now = time.monotonic()
+                if flush_at is not None and now >= flush_at:
+                    yield flush()
+                    last_sent = now
+                elif SSE_HEARTBEAT_SECONDS > 0 and now - last_sent >= SSE_HEARTBEAT_SECONDS:
+                    yield HEARTBEAT
+                    last_sent = now
+                continue
+
+            now = time.monotonic()
+            if event is _END:
+                break
+            if isinstance(event, _SourceFailed):
+                if buffer:
+                    yield flush()
+                raise event.error
+            if window > 0 and event.keys() == {"content"}:
+                buffer.append(event["content"])
+                buffered_bytes += len(event["content"].encode("utf-8"))
+                if flush_at is None:
+                    flush_at = now + window
+                if buffered_bytes >= SSE_COALESCE_BYTES:
+                    yield flush()
+                    last_sent = now
+                continue
+
+            if buffer:
+                yield flush()
+            yield encode_event(event)
+            last_sent = now
+
+        if buffer:
+            yield flush()
+    finally:
+        if not reader.done():
+            reader.cancel()
+        with contextlib.suppress(BaseException):
+            await reader
+
+
+def sse_response(events: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Stream event payloads to the client as Server-Sent Events.
+
+    Args:
+        events (AsyncIterator[dict]): Payloads to send
+
+    Returns:
+        StreamingResponse: The event stream
+    """
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+        }
+    )
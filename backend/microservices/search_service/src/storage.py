@@ -0,0 +1,232 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Shared by the rag, search and stocks services
+HISTORY_DB = "./database/history.sqlite"
+# Milliseconds a connection waits for another service's write lock before failing
+BUSY_TIMEOUT_MS = int(os.getenv("HISTORY_BUSY_TIMEOUT_MS", "5000"))
+# Time of the latest turn of every conversation in any service; retention is keyed on it
+ACTIVITY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS conversation_activity ("
+    "chat_id TEXT PRIMARY KEY, last_active REAL NOT NULL)"
+)
+# Checkpoints kept per conversation; only the latest is needed to resume it
+CHECKPOINTS_PER_THREAD = int(os.getenv("HISTORY_CHECKPOINTS_PER_THREAD", "10"))
+# Conversations idle for longer than this are deleted; 0 keeps them forever
+MAX_AGE_DAYS = float(os.getenv("HISTORY_MAX_AGE_DAYS", "30"))
+# Seconds between pruning and compaction runs; 0 disables the job. Only this
+# service maintains the shared file, for the rag and stocks services as well
+MAINTENANCE_INTERVAL = float(os.getenv("HISTORY_MAINTENANCE_INTERVAL", "3600"))
+# The file is rebuilt with VACUUM once this share of its pages is free
+VACUUM_FREE_RATIO = 0.2
+# Namespaces under which the services store conversation summaries
+SUMMARY_NAMESPACES = ("rag", "search", "stocks")
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100 ns units
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+async def connect(path: str = HISTORY_DB) -> aiosqlite.Connection:
+    """
+    Open a connection to the history database tuned for concurrent writers.
+
+    WAL lets readers proceed while another service writes, the busy timeout
+    makes writers queue for the lock instead of failing, and synchronous=NORMAL
+    drops the fsync on every commit, which is safe in WAL mode.
+
+    Args:
+        path (str): Path to the SQLite file
+
+    Returns:
+        aiosqlite.Connection: The open connection
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = await aiosqlite.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    await connection.execute("PRAGMA journal_mode=WAL")
+    await connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    await connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time encoded in a LangGraph checkpoint id (a version 6 UUID)."""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except ValueError:
+        return None
+    if value.version != 6:
+        return None
+    bits = value.int
+    timestamp = ((bits >> 96) << 28) | (((bits >> 80) & 0xFFFF) << 12) | ((bits >> 64) & 0x0FFF)
+    return (timestamp - UUID_EPOCH_OFFSET) / 1e7
+
+
+async def _table_exists(connection: aiosqlite.Connection, name: str) -> bool:
+    async with connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ) as cursor:
+        return await cursor.fetchone() is not None
+
+
+async def last_activity(connection: aiosqlite.Connection) -> Dict[str, float]:
+    """
+    Find when every conversation in the history database was last active.
+
+    A chat id is shared by the rag, search and stocks services, so its activity is
+    the newest of the times recorded by any of them and of its newest checkpoint.
+    Conversations with no recorded time, such as rag histories written before
+    activity was tracked, are stamped with the current time so they age from now.
+
+    Args:
+        connection (aiosqlite.Connection): Connection to the history database
+
+    Returns:
+        Dict[str, float]: Unix time of the latest activity, by chat id
+    """
+    await connection.execute(ACTIVITY_TABLE)
+    activity = {}
+    async with connection.execute("SELECT chat_id, last_active FROM conversation_activity") as cursor:
+        async for chat_id, last_active in cursor:
+            activity[chat_id] = last_active
+    if await _table_exists(connection, "checkpoints"):
+        async with connection.execute(
+            "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+        ) as cursor:
+            async for thread_id, checkpoint_id in cursor:
+                created = checkpoint_time(checkpoint_id)
+                if created is not None:
+                    activity[thread_id] = max(activity.get(thread_id, created), created)
+
+    chat_ids = set()
+    if await _table_exists(connection, "checkpoints"):
+        async with connection.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+            chat_ids.update([row[0] async for row in cursor])
+    if await _table_exists(connection, "message_store"):
+        async with connection.execute("SELECT DISTINCT session_id FROM message_store") as cursor:
+            chat_ids.update([row[0] async for row in cursor])
+    unknown = [(chat_id, time.time()) for chat_id in chat_ids if chat_id not in activity]
+    if unknown:
+        await connection.executemany(
+            "INSERT OR IGNORE INTO conversation_activity VALUES (?, ?)", unknown
+        )
+        activity.update(unknown)
+    return activity
+
+
+async def prune_history(
+    connection: aiosqlite.Connection,
+    per_thread: int = CHECKPOINTS_PER_THREAD,
+    max_age_days: float = MAX_AGE_DAYS,
+) -> Tuple[int, int]:
+    """
+    Delete expired conversations from every service and all but the newest
+    checkpoints of the others.
+
+    A conversation expires once it has been idle in all services for longer than
+    `max_age_days`; its checkpoints, rag messages, summaries and activity record
+    are then removed together.
+
+    Args:
+        connection (aiosqlite.Connection): Connection to the history database
+        per_thread (int): Checkpoints kept per conversation and namespace
+        max_age_days (float): Idle time after which a conversation is deleted; 0 keeps all
+
+    Returns:
+        Tuple[int, int]: Number of conversations and checkpoints deleted
+    """
+    expired = []
+    if max_age_days > 0:
+        cutoff = time.time() - max_age_days * 86400
+        activity = await last_activity(connection)
+        expired = [(chat_id,) for chat_id, last_active in activity.items() if last_active < cutoff]
+
+    has_checkpoints = await _table_exists(connection, "checkpoints")
+    deleted = 0
+    if expired:
+        if has_checkpoints:
+            cursor = await connection.executemany("DELETE FROM checkpoints WHERE thread_id = ?", expired)
+            deleted += cursor.rowcount
+        if await _table_exists(connection, "message_store"):
+            await connection.executemany("DELETE FROM message_store WHERE session_id = ?", expired)
+        if await _table_exists(connection, "conversation_summaries"):
+            await connection.executemany(
+                "DELETE FROM conversation_summaries WHERE session_key = ?",
+                [(f"{namespace}:{chat_id}",) for (chat_id,) in expired for namespace in SUMMARY_NAMESPACES],
+            )
+        await connection.executemany("DELETE FROM conversation_activity WHERE chat_id = ?", expired)
+    if has_checkpoints:
+        # Checkpoint ids are time-ordered, so the highest ones are the newest
+        cursor = await connection.execute(
+            "DELETE FROM checkpoints WHERE rowid IN ("
+            "SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER ("
+            "PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position "
+            "FROM checkpoints) WHERE position > ?)",
+            (max(per_thread, 1),),
+        )
+        deleted += cursor.rowcount
+        if await _table_exists(connection, "writes"):
+            await connection.execute(
+                "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints AS c "
+                "WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns "
+                "AND c.checkpoint_id = writes.checkpoint_id)"
+            )
+    await connection.commit()
+    return len(expired), deleted
+
+
+async def compact(connection: aiosqlite.Connection) -> None:
+    """
+    Fold the write-ahead log back into the database file and rebuild the file
+    once enough of it is free space.
+
+    Args:
+        connection (aiosqlite.Connection): Connection to the history database
+    """
+    await connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    async with connection.execute("PRAGMA freelist_count") as cursor:
+        free_pages = (await cursor.fetchone())[0]
+    async with connection.execute("PRAGMA page_count") as cursor:
+        pages = (await cursor.fetchone())[0]
+    if pages and free_pages / pages >= VACUUM_FREE_RATIO:
+        await connection.execute("VACUUM")
+        logger.info(f"Vacuumed history database, {free_pages} of {pages} pages were free")
+
+
+async def run_maintenance() -> None:
+    """Prune expired conversations and old checkpoints and compact the history database once."""
+    connection = await connect()
+    try:
+        threads, checkpoints = await prune_history(connection)
+        await compact(connection)
+        logger.info(
+            f"History maintenance removed {threads} expired conversations and {checkpoints} checkpoints"
+        )
+    finally:
+        await connection.close()
+
+
+async def _maintenance_loop() -> None:
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            await run_maintenance()
+        except Exception as e:
+            logger.warning(f"History maintenance failed: {e}")
+
+
+def start_maintenance() -> Optional[asyncio.Task]:
+    """
+    Start the periodic maintenance job.
+
+    Returns:
+        Optional[asyncio.Task]: The running job, or None if it is disabled
+    """
+    if MAINTENANCE_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(_maintenance_loop())
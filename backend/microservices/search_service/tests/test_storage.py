@@ -0,0 +1,134 @@
+import time
+import uuid
+import asyncio
+import multiprocessing
+from src import storage
+
+WRITES = 200
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS message_store (id INTEGER PRIMARY KEY, session_id TEXT, message TEXT)",
+    "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS writes (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS conversation_summaries (session_key TEXT PRIMARY KEY, "
+    "summary TEXT NOT NULL, summarized_messages INTEGER NOT NULL)",
+    storage.ACTIVITY_TABLE,
+)
+
+
+def checkpoint_id(created: float) -> str:
+    """Version 6 UUID like LangGraph's checkpoint ids, created at a given Unix time."""
+    timestamp = int(created * 1e7) + storage.UUID_EPOCH_OFFSET
+    bits = ((timestamp >> 28) << 96) | (((timestamp >> 12) & 0xFFFF) << 80) | (6 << 76)
+    bits |= (timestamp & 0x0FFF) << 64 | (2 << 62) | uuid.uuid4().int & ((1 << 62) - 1)
+    return str(uuid.UUID(int=bits))
+
+
+async def create_schema(path):
+    connection = await storage.connect(path)
+    for statement in SCHEMA:
+        await connection.execute(statement)
+    await connection.commit()
+    await connection.close()
+
+
+async def write(path, service, maintain):
+    connection = await storage.connect(path)
+    try:
+        for i in range(WRITES):
+            chat_id = f"{service}-{i}"
+            if service == "rag":
+                await connection.execute(
+                    "INSERT INTO message_store (session_id, message) VALUES (?, ?)", (chat_id, "{}")
+                )
+            else:
+                await connection.execute(
+                    "INSERT INTO checkpoints VALUES (?, '', ?)", (chat_id, checkpoint_id(time.time()))
+                )
+            await connection.execute(
+                "INSERT OR REPLACE INTO conversation_summaries VALUES (?, 'summary', 2)",
+                (f"{service}:{chat_id}",),
+            )
+            await connection.execute(
+                "INSERT OR REPLACE INTO conversation_activity VALUES (?, ?)", (chat_id, time.time())
+            )
+            await connection.commit()
+            if maintain and i % 50 == 0:
+                await storage.prune_history(connection)
+                await storage.compact(connection)
+    finally:
+        await connection.close()
+
+
+def run_service(path, service, maintain):
+    asyncio.run(write(path, service, maintain))
+
+
+def test_three_services_write_concurrently(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    asyncio.run(create_schema(path))
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_service, args=(path, service, service == "search"))
+        for service in ("rag", "search", "stocks")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+
+    async def count(sql):
+        connection = await storage.connect(path)
+        async with connection.execute(sql) as cursor:
+            value = (await cursor.fetchone())[0]
+        await connection.close()
+        return value
+
+    assert asyncio.run(count("SELECT COUNT(*) FROM message_store")) == WRITES
+    assert asyncio.run(count("SELECT COUNT(*) FROM checkpoints")) == 2 * WRITES
+    assert asyncio.run(count("SELECT COUNT(*) FROM conversation_summaries")) == 3 * WRITES
+
+
+def test_retention_uses_newest_activity_across_services(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    old = time.time() - 40 * 86400
+
+    async def run():
+        await create_schema(path)
+        connection = await storage.connect(path)
+        try:
+            # Both chats were last checkpointed by search long ago; rag used "shared" today
+            for chat_id in ("shared", "idle"):
+                await connection.execute(
+                    "INSERT INTO checkpoints VALUES (?, '', ?)", (chat_id, checkpoint_id(old))
+                )
+                await connection.execute(
+                    "INSERT INTO message_store (session_id, message) VALUES (?, '{}')", (chat_id,)
+                )
+                await connection.execute(
+                    "INSERT INTO conversation_summaries VALUES (?, 'summary', 2)", (f"rag:{chat_id}",)
+                )
+            await connection.execute("INSERT INTO conversation_activity VALUES ('shared', ?)", (time.time(),))
+            await connection.execute("INSERT INTO conversation_activity VALUES ('idle', ?)", (old,))
+            await connection.commit()
+
+            expired, _ = await storage.prune_history(connection, max_age_days=30)
+            tables = {}
+            for table, column in (
+                ("checkpoints", "thread_id"), ("message_store", "session_id"),
+                ("conversation_summaries", "session_key"),
+            ):
+                async with connection.execute(f"SELECT {column} FROM {table}") as cursor:
+                    tables[table] = sorted([row[0] async for row in cursor])
+            return expired, tables
+        finally:
+            await connection.close()
+
+    expired, tables = asyncio.run(run())
+    assert expired == 1
+    assert tables == {
+        "checkpoints": ["shared"],
+        "message_store": ["shared"],
+        "conversation_summaries": ["rag:shared"],
+    }
@@ -0,0 +1,81 @@
+"""
+Per-request latency of the MCP tool server: a cold session per request (spawn
+server.py, import yfinance, open a history connection, initialize, load the tools
+and compile the agent, as before the pool) vs checking a session out of a started `MCPSessionPool`.
+
+Each request lists the server's tools over the session, a round trip that needs
+no network; the LLM and Yahoo Finance calls are the same in both paths and are
+left out.
+
+    python -m bench.bench_mcp_sessions [requests] 2>/dev/null  # server logs go to stderr
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+from mcp import StdioServerParameters
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from src.services import client
+
+REQUESTS = 20
+
+
+def summary(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))]
+    return (
+        f"median {statistics.median(timings) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  mean {statistics.mean(timings) * 1000:7.1f} ms"
+    )
+
+
+async def cold(requests):
+    timings = []
+    for index in range(requests):
+        started = time.perf_counter()
+        connection = await client.connect()
+        session = client.MCPServerSession(index, AsyncSqliteSaver(connection))
+        try:
+            await session.start()
+            await session.session.list_tools()
+        finally:
+            await session.stop()
+            await connection.close()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def pooled(requests):
+    pool = client.MCPSessionPool(size=1)
+    started = time.perf_counter()
+    await pool.start()
+    startup = time.perf_counter() - started
+    timings = []
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            async with pool.checkout() as session:
+                await session.session.list_tools()
+            timings.append(time.perf_counter() - started)
+    finally:
+        await pool.close()
+    return startup, timings
+
+
+async def main(requests):
+    # The server runs under this interpreter, which has the service's dependencies
+    client.server_params = StdioServerParameters(
+        command=sys.executable, args=[client.server_py_path], env=None
+    )
+    print(f"{requests} requests, {os.cpu_count()} CPU")
+    print(f"  cold: {summary(await cold(requests))}")
+    startup, timings = await pooled(requests)
+    print(f"pooled: {summary(timings)}  (pool startup {startup * 1000:.0f} ms, once)")
+
+
+if __name__ == "__main__":
+    # History checkpoints go to ./database, so keep them out of the service folder
+    os.chdir(tempfile.mkdtemp())
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS))
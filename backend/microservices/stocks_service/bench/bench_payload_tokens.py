@@ -0,0 +1,83 @@
+"""
+Prompt tokens of the stock_info and stock_price tool outputs before (the full
+yfinance profile and pandas `to_string()`) and after (`select_info` JSON and
+`format_closes`).
+
+Without arguments the bench uses `fixtures/yfinance_info.json`, a profile with
+the field set yfinance returns for a large-cap equity (illustrative values), and
+a generated month of closes with yfinance's index and float precision. Given
+tickers, it fetches them live from Yahoo Finance instead.
+
+Tokens are counted with tiktoken's cl100k_base when it is installed and cached,
+otherwise estimated at four characters per token.
+
+    python -m bench.bench_payload_tokens [TICKER ...]
+"""
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from src.services.server import YFinanceSource, PRICE_PERIOD, format_closes, select_info
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "yfinance_info.json")
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return (lambda text: len(encoding.encode(text))), "cl100k_base tokens"
+    except Exception:
+        return (lambda text: -(-len(text) // 4)), "estimated tokens (chars / 4)"
+
+
+def sample_closes(days: int = 21, seed: int = 0) -> pd.Series:
+    """A month of daily closes shaped like `yf.Ticker(...).history()["Close"]`."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2025-09-18", periods=days, tz="America/New_York", name="Date")
+    prices = 230 * np.cumprod(1 + rng.normal(0, 0.012, days))
+    # yfinance returns float32-derived prices, e.g. 236.88999938964844
+    return pd.Series(prices.astype(np.float32).astype(np.float64), index=index, name="Close")
+
+
+def payloads(ticker: str, info: dict, closes: pd.Series) -> dict:
+    return {
+        "stock_info": (
+            f"Background information for {ticker}: {info}",
+            json.dumps({"symbol": ticker, **select_info(info)}, separators=(",", ":"), ensure_ascii=False),
+        ),
+        "stock_info fields=[marketCap,trailingPE]": (
+            f"Background information for {ticker}: {info}",
+            json.dumps(
+                {"symbol": ticker, **select_info(info, ["marketCap", "trailingPE"])},
+                separators=(",", ":"), ensure_ascii=False,
+            ),
+        ),
+        "stock_price": (
+            f"Stock price over the last month for {ticker}: {closes.to_string()}",
+            format_closes(ticker, closes),
+        ),
+    }
+
+
+def main(tickers) -> None:
+    count, unit = token_counter()
+    if tickers:
+        source = YFinanceSource()
+        samples = [(t.upper(), source.info(t), source.closes(t, PRICE_PERIOD)) for t in tickers]
+    else:
+        with open(FIXTURE) as f:
+            info = json.load(f)
+        samples = [(info["symbol"], info, sample_closes())]
+
+    print(unit)
+    for ticker, info, closes in samples:
+        print(f"{ticker}: {len(info)} profile fields, {len(closes)} closes")
+        for tool, (before, after) in payloads(ticker, info, closes).items():
+            old, new = count(before), count(after)
+            print(f"{tool:>40}: before {old:6d}  after {new:5d}  {100 * (1 - new / old):5.1f}% fewer")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
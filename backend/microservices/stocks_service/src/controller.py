@@ -1,7 +1,7 @@
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from .services.client import agent
+from .services.sse import sse_response
 import json
 
 import logging
@@ -49,18 +49,10 @@ async def stocks_mcp(request: ChatRequest):
                         pass
                 else:
                     # This is the final response content
-                    yield f"data: {json.dumps({'content': chunk})}\n\n"
+                    yield {'content': chunk}
         
         # Send URLs at the end
         if urls:
-            yield f"data: {json.dumps({'urls': urls})}\n\n"
+            yield {'urls': urls}
             
-    return StreamingResponse(
-        generate_response(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/event-stream",
-        }
-    )
\ No newline at end of file
+    return sse_response(generate_response())
\ No newline at end of file
@@ -1,12 +1,15 @@
 import os
+import asyncio
 import logging
-import aiosqlite
+from contextlib import asynccontextmanager
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from langchain_groq import ChatGroq
 from langchain_mcp_adapters.tools import load_mcp_tools
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from .history import history_hook, schedule_summary
+from .storage import connect
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,11 +32,204 @@ server_params = StdioServerParameters(
     env=None,
 )
 
+# Long-lived MCP server processes; each serves one request at a time
+MCP_POOL_SIZE = int(os.getenv("STOCKS_MCP_POOL_SIZE", "2"))
+# Seconds a server may take to answer the health check ping before it is restarted
+MCP_PING_TIMEOUT = float(os.getenv("STOCKS_MCP_PING_TIMEOUT", "5"))
+# Seconds a server may take to launch and initialize its session
+MCP_START_TIMEOUT = float(os.getenv("STOCKS_MCP_START_TIMEOUT", "30"))
+# Seconds a request waits for a free session before giving up
+MCP_CHECKOUT_TIMEOUT = float(os.getenv("STOCKS_MCP_CHECKOUT_TIMEOUT", "30"))
+SYSTEM_PROMPT = "You are a helpful assistant. Respond concisely and only answer the specific question asked."
+
+
+class MCPServerSession:
+    """
+    One MCP server subprocess with an initialized session, its tools and an agent
+    compiled over them.
+
+    The stdio transport has to be opened and closed by the same task, so a
+    background task owns it for the whole lifetime of the session. The agent
+    checkpoints through `checkpointer`, which the pool shares between sessions.
+    """
+    def __init__(self, index: int, checkpointer: AsyncSqliteSaver = None) -> None:
+        self.index = index
+        self.checkpointer = checkpointer
+        self.agent = None
+        self.session = None
+        self._stop = None
+        self._task = None
+
+
+    async def start(self) -> None:
+        """
+        Launch the server, initialize the session and compile the agent.
+
+        Raises:
+            TimeoutError: If the session is not ready within `STOCKS_MCP_START_TIMEOUT`
+        """
+        self._stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            async with asyncio.timeout(MCP_START_TIMEOUT):
+                await ready
+        except BaseException:
+            await self.stop()
+            if ready.done() and not ready.cancelled():
+                ready.exception()
+            raise
+        logger.info(f"MCP server session {self.index} started")
+
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        try:
+            async with stdio_client(server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    tools = await load_mcp_tools(session)
+                    self.session = session
+                    self.agent = create_react_agent(
+                        model=llm,
+                        tools=tools,
+                        prompt=SYSTEM_PROMPT,
+                        checkpointer=self.checkpointer,
+                        pre_model_hook=history_hook("stocks")
+                    )
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                # Wake `start` whatever ended the task, including cancellation
+                ready.set_exception(
+                    e if isinstance(e, Exception)
+                    else RuntimeError(f"MCP server session {self.index} was cancelled while starting")
+                )
+            elif isinstance(e, Exception):
+                logger.error(f"MCP server session {self.index} failed: {e}")
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.session = None
+            self.agent = None
+            if not ready.done():
+                ready.set_exception(
+                    RuntimeError(f"MCP server session {self.index} exited before it was ready")
+                )
+
+
+    async def is_healthy(self) -> bool:
+        """Return whether the server is running and answers a ping in time."""
+        if self._task is None or self._task.done() or self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), MCP_PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+
+    async def stop(self) -> None:
+        """Shut the server down."""
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            if self.session is None and not self._task.done():
+                # Still starting: it would not notice the stop event
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"Error stopping MCP server session {self.index}: {e}")
+            self._task = None
+
+
+    async def restart(self) -> None:
+        await self.stop()
+        await self.start()
+
+
+class MCPSessionPool:
+    """
+    Pool of long-lived MCP server sessions created at startup.
+
+    Requests check a session out for the duration of their agent run. A session
+    that fails its health check on checkout is restarted before it is handed out.
+
+    All sessions checkpoint through one connection to the history database, opened
+    by the pool: SQLite serializes writers anyway, so a connection per session
+    would only add lock contention between them.
+    """
+    def __init__(self, size: int = MCP_POOL_SIZE) -> None:
+        self.sessions = [MCPServerSession(index) for index in range(size)]
+        self._connection = None
+        self._idle = None
+
+
+    async def start(self) -> None:
+        """
+        Open the shared history connection and start every session. Sessions that
+        fail to start are retried on checkout.
+        """
+        self._connection = await connect()
+        checkpointer = AsyncSqliteSaver(self._connection)
+        await checkpointer.setup()
+        for session in self.sessions:
+            session.checkpointer = checkpointer
+        self._idle = asyncio.Queue()
+        results = await asyncio.gather(
+            *(session.start() for session in self.sessions), return_exceptions=True
+        )
+        for session, result in zip(self.sessions, results):
+            if isinstance(result, Exception):
+                logger.error(f"MCP server session {session.index} did not start: {result}")
+            self._idle.put_nowait(session)
+
+
+    @asynccontextmanager
+    async def checkout(self):
+        """
+        Borrow a healthy session, restarting it first if needed.
+
+        Yields:
+            MCPServerSession: Session reserved for the caller until the block exits
+
+        Raises:
+            RuntimeError: If the pool has not been started
+            TimeoutError: If no session frees up within `STOCKS_MCP_CHECKOUT_TIMEOUT`
+        """
+        if self._idle is None:
+            raise RuntimeError("MCP session pool has not been started")
+        async with asyncio.timeout(MCP_CHECKOUT_TIMEOUT):
+            session = await self._idle.get()
+        try:
+            if not await session.is_healthy():
+                logger.warning(f"Restarting MCP server session {session.index}")
+                await session.restart()
+            yield session
+        finally:
+            self._idle.put_nowait(session)
+
+
+    async def close(self) -> None:
+        """Stop every session, then close the shared history connection."""
+        for session in self.sessions:
+            await session.stop()
+        self._idle = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+mcp_pool = MCPSessionPool()
+
 
 async def agent(question: str, thread_id: str = None):
     """
-    This function establishes a connection to an MCP server, loads available tools,
-    and creates a ReAct agent that can use those tools to answer questions.
+    This function checks out a pooled MCP server session and runs its ReAct agent,
+    which uses the server's tools to answer the question.
     
     Args:
         question (str): The user's question to answer using MCP server tools
@@ -44,25 +240,22 @@ async def agent(question: str, thread_id: str = None):
             - content (str): Response content or tool result from MCP server
             - is_tool_call (bool): True if the chunk is from a tool call, False if it's content
     """
-    async with stdio_client(server_params) as (read, write):
-        connection = await aiosqlite.connect("./database/history.sqlite", check_same_thread=False)
-        checkpointer = AsyncSqliteSaver(connection)
-
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            tools = await load_mcp_tools(session)
-            agent = create_react_agent(
-                model=llm,
-                tools=tools,
-                prompt="You are a helpful assistant. Respond concisely and only answer the specific question asked.",
-                checkpointer=checkpointer
-            )
-            config = {"configurable": {"thread_id": thread_id}} if thread_id else {}
-            logger.info(f"Conversation thread ID: {thread_id}")
-
-            message = {"messages": [{"role": "user", "content": question}]}
-
-            async for chunk in agent.astream(message, config, stream_mode="messages"):
-                message = chunk[0]
-                yield (message.content, True if hasattr(message, "tool_call_id") else False)
-                
\ No newline at end of file
+    async with mcp_pool.checkout() as session:
+        config = {"configurable": {"thread_id": thread_id}} if thread_id else {}
+        logger.info(f"Conversation thread ID: {thread_id}")
+
+        message = {"messages": [{"role": "user", "content": question}]}
+
+        async for chunk in session.agent.astream(message, config, stream_mode="messages"):
+            message = chunk[0]
+            yield (message.content, True if hasattr(message, "tool_call_id") else False)
+
+        if thread_id:
+            agent = session.agent
+            schedule_summary(f"stocks:{thread_id}", lambda: load_messages(agent, config))
+
+
+async def load_messages(agent, config: dict) -> list:
+    """Return every checkpointed message of a conversation."""
+    state = await agent.aget_state(config)
+    return state.values.get("messages", [])
@@ -0,0 +1,230 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+import aiosqlite
+from langchain_groq import ChatGroq
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.messages.utils import count_tokens_approximately
+from .storage import ACTIVITY_TABLE, connect
+
+logger = logging.getLogger(__name__)
+
+# Most recent turns sent verbatim, and the token budget they must fit in;
+# older turns are folded into a rolling summary
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "6"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "llama-3.1-8b-instant")
+SUMMARY_MAX_TOKENS = 400
+
+summary_llm = ChatGroq(model=SUMMARY_MODEL, temperature=0, max_tokens=SUMMARY_MAX_TOKENS, max_retries=3)
+
+# Background summarization tasks, referenced until they finish
+_pending = set()
+# Long-lived connection for the summary table, opened on first use
+_connection = None
+_connection_lock = asyncio.Lock()
+
+
+def window_start(
+    messages: Sequence[BaseMessage],
+    max_turns: int = HISTORY_MAX_TURNS,
+    budget: int = HISTORY_TOKEN_BUDGET,
+) -> int:
+    """
+    Find where the verbatim part of a conversation starts.
+
+    A turn starts at a human message and includes every message up to the next
+    one, so tool calls are never separated from their results. The window holds
+    at most `max_turns` turns and is shortened from the front until it fits the
+    token budget, but always keeps the latest turn.
+
+    Args:
+        messages (Sequence[BaseMessage]): Conversation in chronological order
+        max_turns (int): Maximum number of turns kept verbatim
+        budget (int): Token budget for the verbatim turns
+
+    Returns:
+        int: Index of the first message of the window
+    """
+    turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if not turn_starts:
+        return 0
+    candidates = turn_starts[-max_turns:] if max_turns > 0 else turn_starts[-1:]
+    for start in candidates[:-1]:
+        if count_tokens_approximately(messages[start:]) <= budget:
+            return start
+    return candidates[-1]
+
+
+def bounded_messages(
+    messages: Sequence[BaseMessage], summary: str, summarized: int
+) -> List[BaseMessage]:
+    """
+    Return the recent window of a conversation, preceded by the summary of older turns.
+
+    The window never starts after the last message the summary covers: while a
+    background summary lags behind or has failed, the turns it has not folded in
+    yet are kept verbatim instead of being dropped.
+
+    Args:
+        messages (Sequence[BaseMessage]): Conversation in chronological order
+        summary (str): Rolling summary of the turns before the window
+        summarized (int): Number of leading messages the summary covers
+
+    Returns:
+        List[BaseMessage]: Messages to send to the model
+    """
+    if summarized > len(messages):
+        # The conversation was cleared or replaced since the summary was written
+        summary, summarized = "", 0
+    window = list(messages[min(window_start(messages), summarized):])
+    if summary:
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + window
+    return window
+
+
+async def _connect() -> aiosqlite.Connection:
+    global _connection
+    async with _connection_lock:
+        if _connection is None:
+            connection = await connect()
+            await connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_summaries ("
+                "session_key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "summarized_messages INTEGER NOT NULL)"
+            )
+            await connection.execute(ACTIVITY_TABLE)
+            await connection.commit()
+            _connection = connection
+    return _connection
+
+
+async def close() -> None:
+    """Wait for pending summaries and close the summary connection."""
+    global _connection
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
+
+
+async def load_summary(session_key: str) -> Tuple[str, int]:
+    """
+    Read the rolling summary of a conversation.
+
+    Args:
+        session_key (str): Conversation key, namespaced by service
+
+    Returns:
+        Tuple[str, int]: The summary and the number of leading messages it covers
+    """
+    connection = await _connect()
+    async with connection.execute(
+        "SELECT summary, summarized_messages FROM conversation_summaries WHERE session_key = ?",
+        (session_key,),
+    ) as cursor:
+        row = await cursor.fetchone()
+    return (row[0], row[1]) if row else ("", 0)
+
+
+async def save_summary(session_key: str, summary: str, summarized_messages: int) -> None:
+    connection = await _connect()
+    await connection.execute(
+        "INSERT OR REPLACE INTO conversation_summaries VALUES (?, ?, ?)",
+        (session_key, summary, summarized_messages),
+    )
+    await connection.commit()
+
+
+async def record_activity(session_key: str) -> None:
+    """
+    Mark a conversation as active now. The chat id is shared by every service,
+    so history retention only expires it once it is idle in all of them.
+
+    Args:
+        session_key (str): Conversation key, namespaced by service
+    """
+    _, _, chat_id = session_key.partition(":")
+    connection = await _connect()
+    await connection.execute(
+        "INSERT INTO conversation_activity VALUES (?, ?) ON CONFLICT(chat_id) "
+        "DO UPDATE SET last_active = MAX(last_active, excluded.last_active)",
+        (chat_id, time.time()),
+    )
+    await connection.commit()
+
+
+async def update_summary(session_key: str, messages: Sequence[BaseMessage]) -> None:
+    """
+    Fold the turns that fell out of the verbatim window into the rolling summary.
+
+    Args:
+        session_key (str): Conversation key, namespaced by service
+        messages (Sequence[BaseMessage]): Full conversation in chronological order
+    """
+    start = window_start(messages)
+    summary, summarized = await load_summary(session_key)
+    if summarized > len(messages):
+        # The conversation was cleared or replaced
+        summary, summarized = "", 0
+    if start <= summarized:
+        return
+
+    transcript = get_buffer_string(messages[summarized:start])
+    prompt = (
+        "Update the summary of a conversation with the new lines below. Keep names, "
+        "facts, figures and open questions; drop pleasantries. Answer with the summary only.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\nNew lines:\n{transcript}"
+    )
+    result = await summary_llm.ainvoke(prompt)
+    await save_summary(session_key, result.content, start)
+    logger.info(f"Summarized {start} messages of conversation {session_key}")
+
+
+def schedule_summary(
+    session_key: str, load_messages: Callable[[], Awaitable[Sequence[BaseMessage]]]
+) -> None:
+    """
+    Record the turn's activity and update the rolling summary in the background,
+    off the response path.
+
+    Args:
+        session_key (str): Conversation key, namespaced by service
+        load_messages (Callable): Coroutine function returning the full conversation
+    """
+    async def run():
+        try:
+            await record_activity(session_key)
+            await update_summary(session_key, await load_messages())
+        except Exception as e:
+            logger.warning(f"Could not update summary of conversation {session_key}: {e}")
+
+    task = asyncio.create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def history_hook(namespace: str):
+    """
+    Create a `pre_model_hook` for `create_react_agent` that applies the history
+    policy to the checkpointed messages. The stored state keeps every message;
+    only the model input is bounded.
+
+    Args:
+        namespace (str): Prefix that keeps this service's summaries apart from others
+
+    Returns:
+        Callable: Hook returning the summary and recent window as `llm_input_messages`
+    """
+    async def pre_model_hook(state: dict, config: Optional[RunnableConfig] = None) -> dict:
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        summary, summarized = "", 0
+        if thread_id:
+            summary, summarized = await load_summary(f"{namespace}:{thread_id}")
+        return {"llm_input_messages": bounded_messages(state["messages"], summary, summarized)}
+
+    return pre_model_hook
@@ -1,44 +1,302 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import yfinance as yf
 from mcp.server.fastmcp import FastMCP
 
+# Seconds market data stays cached: prices move, company profiles rarely change
+PRICE_TTL = float(os.getenv("STOCKS_PRICE_TTL", "60"))
+INFO_TTL = float(os.getenv("STOCKS_INFO_TTL", "86400"))
+CACHE_SIZE = int(os.getenv("STOCKS_CACHE_SIZE", "1024"))
+PRICE_PERIOD = "1mo"
+
+# Company profile fields returned by `stock_info` unless the caller selects others
+DEFAULT_INFO_FIELDS = (
+    "longName", "sector", "industry", "country", "website", "currency", "exchange",
+    "marketCap", "currentPrice", "previousClose", "fiftyTwoWeekLow", "fiftyTwoWeekHigh",
+    "trailingPE", "forwardPE", "dividendYield", "beta", "fullTimeEmployees",
+    "recommendationKey", "longBusinessSummary",
+)
+# Longer text fields are cut to this many characters
+INFO_TEXT_MAX_CHARS = int(os.getenv("STOCKS_INFO_TEXT_MAX_CHARS", "400"))
+
+# stdout carries the MCP protocol; logging goes to stderr
+logger = logging.getLogger(__name__)
+
 # Initialize MCP server
 mcp = FastMCP("stockdataserver")
 
+# Returned by `MarketData._get` on a miss; None is a cached "no data" result
+_MISS = object()
+
+
+class YFinanceSource:
+    """
+    Fetch layer backed by the live Yahoo Finance API.
+
+    Any object with the same three methods can be passed to `MarketData`
+    instead, e.g. a local stub that serves canned data.
+    """
+    def closes(self, ticker: str, period: str):
+        """Return the closing price series of one ticker."""
+        return yf.Ticker(ticker).history(period=period)["Close"]
+
+
+    def batch_closes(self, tickers: List[str], period: str) -> Dict[str, Any]:
+        """Return the closing price series of several tickers from one batched download."""
+        data = yf.download(
+            tickers, period=period, group_by="ticker", auto_adjust=True, progress=False
+        )
+        available = set(data.columns.get_level_values(0)) if not data.empty else set()
+        return {
+            ticker: data[ticker]["Close"].dropna() if ticker in available else None
+            for ticker in tickers
+        }
+
+
+    def info(self, ticker: str) -> dict:
+        """Return the company profile of one ticker."""
+        return yf.Ticker(ticker).info
+
+
+class MarketData:
+    """
+    Cached access to a market data source.
+
+    Results are kept for a per-kind TTL, and concurrent lookups of the same
+    ticker share a single fetch. The blocking source runs in worker threads.
+    """
+    def __init__(
+        self,
+        source=None,
+        price_ttl: float = PRICE_TTL,
+        info_ttl: float = INFO_TTL,
+        maxsize: int = CACHE_SIZE,
+    ) -> None:
+        self.source = source or YFinanceSource()
+        self.price_ttl = price_ttl
+        self.info_ttl = info_ttl
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._inflight = {}
+
+
+    def _get(self, key: tuple):
+        entry = self._cache.get(key)
+        if entry is None:
+            return _MISS
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return _MISS
+        self._cache.move_to_end(key)
+        return value
+
+
+    def _set(self, key: tuple, value, ttl: float) -> None:
+        self._cache[key] = (time.monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+
+    async def _load(self, key: tuple, ttl: float, fetch: Callable, *args):
+        """Return the cached value for the key, joining or starting its fetch."""
+        value = self._get(key)
+        if value is not _MISS:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, ttl, asyncio.to_thread(fetch, *args))
+        return await asyncio.shield(task)
+
+
+    def _start(self, key: tuple, ttl: float, fetch: Awaitable) -> asyncio.Task:
+        """Run a fetch in the background, caching its result and publishing it to joiners."""
+        async def run():
+            try:
+                value = await fetch
+                self._set(key, value, ttl)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(run())
+        self._inflight[key] = task
+        return task
+
+
+    async def closes(self, ticker: str):
+        ticker = ticker.strip().upper()
+        return await self._load(
+            ("closes", ticker), self.price_ttl, self.source.closes, ticker, PRICE_PERIOD
+        )
+
+
+    async def info(self, ticker: str) -> dict:
+        ticker = ticker.strip().upper()
+        return await self._load(("info", ticker), self.info_ttl, self.source.info, ticker)
+
+
+    async def many_closes(self, tickers: List[str]) -> Dict[str, Any]:
+        """
+        Closing prices of several tickers. Tickers that are neither cached nor
+        being fetched are downloaded together in one batch.
+
+        Args:
+            tickers (List[str]): Stock tickers
+
+        Returns:
+            Dict[str, Any]: Closing price series per upper-cased ticker, None when
+                the source has no data for it, or the exception its fetch raised
+        """
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers))
+        missing = [
+            ticker for ticker in tickers
+            if self._get(("closes", ticker)) is _MISS and ("closes", ticker) not in self._inflight
+        ]
+        if missing:
+            batch = asyncio.create_task(
+                asyncio.to_thread(self.source.batch_closes, missing, PRICE_PERIOD)
+            )
+            for ticker in missing:
+                self._start(("closes", ticker), self.price_ttl, self._pick(batch, ticker))
+        values = await asyncio.gather(
+            *(self._load(("closes", ticker), self.price_ttl, self.source.closes, ticker, PRICE_PERIOD)
+              for ticker in tickers),
+            return_exceptions=True,
+        )
+        for ticker, value in zip(tickers, values):
+            if isinstance(value, Exception):
+                logger.error(f"Error retrieving stock price for {ticker}: {value}")
+        return dict(zip(tickers, values))
+
+
+    @staticmethod
+    async def _pick(batch: asyncio.Task, ticker: str):
+        return (await asyncio.shield(batch))[ticker]
+
+
+market_data = MarketData()
+
+
+def format_closes(ticker: str, closes) -> str:
+    """
+    Encode a closing price series as a compact table.
+
+    A summary line (first and last close, change, range) is followed by one
+    `date,close` row per trading day with prices rounded to cents.
+
+    Args:
+        ticker (str): Stock ticker the series belongs to
+        closes: Closing prices indexed by date
+
+    Returns:
+        str: The encoded series
+    """
+    if closes is None or closes.empty:
+        return f"No stock price data found for {ticker}"
+    first, last = float(closes.iloc[0]), float(closes.iloc[-1])
+    change = (last - first) / first * 100 if first else 0.0
+    lines = [
+        f"{ticker} daily close, last month: first={first:.2f} last={last:.2f} "
+        f"change={change:+.2f}% low={float(closes.min()):.2f} high={float(closes.max()):.2f}",
+        "date,close",
+    ]
+    lines.extend(f"{date:%Y-%m-%d},{float(close):.2f}" for date, close in closes.items())
+    return "\n".join(lines)
+
+
+def select_info(info: dict, fields: Optional[List[str]] = None) -> dict:
+    """
+    Pick the requested fields out of a company profile.
+
+    Args:
+        info (dict): Full yfinance profile
+        fields (Optional[List[str]]): Field names to keep; `DEFAULT_INFO_FIELDS` if empty
+
+    Returns:
+        dict: Present fields with long text truncated, plus the requested fields
+            the profile does not have under `unavailable`
+    """
+    selected, unavailable = {}, []
+    for field in fields or DEFAULT_INFO_FIELDS:
+        value = info.get(field)
+        if value is None or value == "":
+            if fields:
+                unavailable.append(field)
+            continue
+        if isinstance(value, str) and len(value) > INFO_TEXT_MAX_CHARS:
+            value = value[:INFO_TEXT_MAX_CHARS].rstrip() + "..."
+        elif isinstance(value, float):
+            value = round(value, 4)
+        selected[field] = value
+    if unavailable:
+        selected["unavailable"] = unavailable
+    return selected
+
 
 @mcp.tool()
-def stock_price(stock_ticker: str) -> str:
+async def stock_price(stock_ticker: str) -> str:
     """Retrieve the last month's closing prices for a given stock ticker.
 
     Args:
         stock_ticker (str): Alphanumeric stock ticker (e.g., 'NVDA').
 
     Returns:
-        str: String representation of the last month's closing prices.
+        str: Summary line followed by `date,close` rows for the last month.
     """
     try:
-        dat = yf.Ticker(stock_ticker)
-        historical_prices = dat.history(period='1mo')
-        last_months_closes = historical_prices['Close']
-        return f"Stock price over the last month for {stock_ticker}: {last_months_closes.to_string()}"
+        last_months_closes = await market_data.closes(stock_ticker)
+        return format_closes(stock_ticker.strip().upper(), last_months_closes)
     except Exception as e:
         return f"Error retrieving stock price for {stock_ticker}: {e}"
 
 @mcp.tool()
-def stock_info(stock_ticker: str) -> str:
+async def stock_prices(stock_tickers: List[str]) -> str:
+    """Retrieve the last month's closing prices for several stock tickers at once.
+
+    Args:
+        stock_tickers (List[str]): Alphanumeric stock tickers (e.g., ['NVDA', 'AMD']).
+
+    Returns:
+        str: For each ticker, a summary line followed by `date,close` rows for the last month.
+    """
+    try:
+        closes = await market_data.many_closes(stock_tickers)
+        return "\n\n".join(
+            f"Error retrieving stock price for {ticker}: {last_months_closes}"
+            if isinstance(last_months_closes, Exception)
+            else format_closes(ticker, last_months_closes)
+            for ticker, last_months_closes in closes.items()
+        )
+    except Exception as e:
+        return f"Error retrieving stock prices for {', '.join(stock_tickers)}: {e}"
+
+@mcp.tool()
+async def stock_info(stock_ticker: str, fields: Optional[List[str]] = None) -> str:
     """Retrieve background information for a given stock ticker.
 
     Args:
         stock_ticker (str): Alphanumeric stock ticker (e.g., 'IBM').
+        fields (List[str], optional): yfinance profile fields to return (e.g.,
+            ['marketCap', 'trailingPE']). Defaults to name, sector, industry,
+            valuation, price range and a short business summary.
 
     Returns:
-        str: Background information about the company.
+        str: JSON object with the selected company information.
     """
     try:
-        dat = yf.Ticker(stock_ticker)
-        return f"Background information for {stock_ticker}: {dat.info}"
+        info = await market_data.info(stock_ticker)
+        payload = {"symbol": stock_ticker.strip().upper(), **select_info(info, fields)}
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
     except Exception as e:
         return f"Error retrieving info for {stock_ticker}: {e}"
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
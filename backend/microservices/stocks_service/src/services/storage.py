@@ -0,0 +1,34 @@
+import os
+import aiosqlite
+
+# Shared by the rag, search and stocks services
+HISTORY_DB = "./database/history.sqlite"
+# Milliseconds a connection waits for another service's write lock before failing
+BUSY_TIMEOUT_MS = int(os.getenv("HISTORY_BUSY_TIMEOUT_MS", "5000"))
+# Time of the latest turn of every conversation in any service; retention is keyed on it
+ACTIVITY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS conversation_activity ("
+    "chat_id TEXT PRIMARY KEY, last_active REAL NOT NULL)"
+)
+
+
+async def connect(path: str = HISTORY_DB) -> aiosqlite.Connection:
+    """
+    Open a connection to the history database tuned for concurrent writers.
+
+    WAL lets readers proceed while another service writes, the busy timeout
+    makes writers queue for the lock instead of failing, and synchronous=NORMAL
+    drops the fsync on every commit, which is safe in WAL mode.
+
+    Args:
+        path (str): Path to the SQLite file
+
+    Returns:
+        aiosqlite.Connection: The open connection
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = await aiosqlite.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    await connection.execute("PRAGMA journal_mode=WAL")
+    await connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    await connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
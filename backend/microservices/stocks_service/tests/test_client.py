@@ -0,0 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from src.services import client
+
+
+def test_start_times_out(monkeypatch):
+    @asynccontextmanager
+    async def hanging_stdio_client(params):
+        await asyncio.Event().wait()
+        yield None, None
+
+    monkeypatch.setattr(client, "stdio_client", hanging_stdio_client)
+    monkeypatch.setattr(client, "MCP_START_TIMEOUT", 0.05)
+    session = client.MCPServerSession(0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(session.start())
+    assert session._task is None
+
+
+def test_start_fails_when_the_server_dies(monkeypatch):
+    @asynccontextmanager
+    async def failing_stdio_client(params):
+        raise OSError("python3 not found")
+        yield
+
+    monkeypatch.setattr(client, "stdio_client", failing_stdio_client)
+    session = client.MCPServerSession(0)
+
+    with pytest.raises(OSError):
+        asyncio.run(session.start())
+    assert session._task is None
+
+
+def test_checkout_times_out_when_every_session_is_busy(monkeypatch):
+    monkeypatch.setattr(client, "MCP_CHECKOUT_TIMEOUT", 0.05)
+    pool = client.MCPSessionPool(size=0)
+
+    async def run():
+        pool._idle = asyncio.Queue()
+        async with pool.checkout():
+            pass
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+
+
+def test_sessions_share_one_history_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    opened = []
+    connect = client.connect
+
+    async def counting_connect():
+        opened.append(await connect())
+        return opened[-1]
+
+    async def start(self):
+        pass
+
+    monkeypatch.setattr(client, "connect", counting_connect)
+    monkeypatch.setattr(client.MCPServerSession, "start", start)
+    pool = client.MCPSessionPool(size=3)
+
+    async def run():
+        await pool.start()
+        checkpointers = {id(session.checkpointer) for session in pool.sessions}
+        await pool.close()
+        return checkpointers
+
+    checkpointers = asyncio.run(run())
+
+    assert len(opened) == 1
+    assert len(checkpointers) == 1
+    assert pool.sessions[0].checkpointer.conn is opened[0]
+    assert pool._connection is None
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from src.services import server
+from src.services.server import MarketData
+
+
+class CountingSource:
+    def __init__(self):
+        self.calls = 0
+
+    def closes(self, ticker, period):
+        self.calls += 1
+        return None
+
+    def batch_closes(self, tickers, period):
+        self.calls += 1
+        return {ticker: None for ticker in tickers}
+
+    def info(self, ticker):
+        self.calls += 1
+        return {}
+
+
+def test_missing_data_is_cached():
+    source = CountingSource()
+    market_data = MarketData(source)
+
+    async def run():
+        assert await market_data.closes("nodata") is None
+        assert await market_data.closes("NODATA") is None
+        assert await market_data.many_closes(["nodata", "other"]) == {"NODATA": None, "OTHER": None}
+        assert await market_data.many_closes(["other"]) == {"OTHER": None}
+
+    asyncio.run(run())
+    # One single-ticker fetch and one batch for OTHER
+    assert source.calls == 2
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(server.time, "monotonic", lambda: now)
+    source = CountingSource()
+    market_data = MarketData(source, price_ttl=60, info_ttl=3600)
+
+    async def run():
+        nonlocal now
+        await market_data.closes("AAPL")
+        await market_data.info("AAPL")
+        now += 59
+        await market_data.closes("AAPL")
+        assert source.calls == 2
+        now += 1
+        await market_data.closes("AAPL")
+        await market_data.info("AAPL")
+        assert source.calls == 3
+
+    asyncio.run(run())
+
+
+def test_concurrent_lookups_share_one_fetch():
+    release = threading.Event()
+
+    class SlowSource(CountingSource):
+        def closes(self, ticker, period):
+            release.wait(5)
+            return super().closes(ticker, period)
+
+    source = SlowSource()
+    market_data = MarketData(source)
+
+    async def run():
+        lookups = [asyncio.create_task(market_data.closes(t)) for t in ("aapl", "AAPL", " aapl ")]
+        await asyncio.sleep(0.05)
+        batch = asyncio.create_task(market_data.many_closes(["AAPL"]))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*lookups, batch)
+
+    results = asyncio.run(run())
+    assert results == [None, None, None, {"AAPL": None}]
+    assert source.calls == 1
+
+
+def test_failed_tickers_get_an_error_line(monkeypatch):
+    class FailingSource(CountingSource):
+        def batch_closes(self, tickers, period):
+            raise ConnectionError("Yahoo Finance unreachable")
+
+    monkeypatch.setattr(server, "market_data", MarketData(FailingSource()))
+
+    output = asyncio.run(server.stock_prices(["nvda", "amd"]))
+
+    assert output.split("\n\n") == [
+        "Error retrieving stock price for NVDA: Yahoo Finance unreachable",
+        "Error retrieving stock price for AMD: Yahoo Finance unreachable",
+    ]